@@ -0,0 +1,135 @@
+"""
+Vectorized backtest of the btc_pattern volume spike / moving average angle strategy
+Each minute, once the windows are full:
+    the trial account and the benchmark grow with the price
+    a spike is a minute whose volume is over volumeMultiplier times the mean of the volumeWindow bars before it
+    on a spike, tradeSize is added to the trial when the moving average of the window bars before the minute is up
+    more than buyAngle on the one window before that, and taken out when it's down below sellAngle,
+    as long as the trial is still worth at least minimum
+    maxAdded is the most ever added, and the benchmark is adjusted as if that much had been invested from the start
+Everything is whole array operations apart from the minimum guard on sales, which depends on the trial's value
+and so on every trade before it, and is settled by a pass over the spike minutes only
+Bars can also be fed in chunks, carrying a BacktestState of the last few bars and the running totals from one
+chunk to the next (see streamBacktest), which gives the same numbers as running them all at once
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from indicators import sma
+from price_data import CHUNK_SIZE, iterChunks
+
+Strategy = namedtuple("Strategy", "window volumeWindow volumeMultiplier buyAngle sellAngle tradeSize minimum")
+# The constants btc_pattern was written with
+STRATEGY = Strategy(window=10, volumeWindow=20, volumeMultiplier=3.0, buyAngle=1.01, sellAngle=0.99,
+                    tradeSize=100.0, minimum=10.0)
+START = 1000.0
+
+# Series for each minute from start on (an index into the bars given), after that minute's trade,
+# and the state to carry on from
+Backtest = namedtuple("Backtest", "start movingAverage trades benchmark trial trialAdded maxAdded benchmarkAdjusted "
+                                  "state")
+# Everything a run needs from the bars before a chunk: the last firstMinute bars, the price growth is measured from
+# (None until the windows first fill), START plus each trade over the growth when it was made, trialAdded and maxAdded
+BacktestState = namedtuple("BacktestState", "prices volumes basePrice invested trialAdded maxAdded")
+
+
+def firstMinute(strategy=STRATEGY):
+    """
+    First minute with both windows full, from where the backtest runs
+    """
+    return max(2 * strategy.window, strategy.volumeWindow)
+
+
+def signals(prices, volumes, strategy=STRATEGY):
+    """
+    (movingAverage, buys, sells) for each minute from firstMinute on
+    movingAverage is the mean of the window prices before the minute, sells are the minutes that would sell
+    if the trial is worth enough
+    """
+    start = firstMinute(strategy)
+    # Means of the windows ending at each bar, shifted one on so a minute only sees the bars before it
+    averages = sma(prices, strategy.window, exact=True)
+    movingAverage = averages[start - 1:-1]
+    prevMovingAverage = averages[start - 1 - strategy.window:len(prices) - 1 - strategy.window]
+    volumeAverage = sma(volumes, strategy.volumeWindow, exact=True)[start - 1:-1]
+    spikes = volumes[start:] > volumeAverage * strategy.volumeMultiplier
+    angle = movingAverage / prevMovingAverage
+    return movingAverage, spikes & (angle > strategy.buyAngle), spikes & (angle < strategy.sellAngle)
+
+
+def settleSales(growth, buys, sells, strategy=STRATEGY, invested=START):
+    """
+    Trade (+tradeSize, -tradeSize or 0) in each minute
+    The trial is growth times START plus every trade divided by the growth when it was made, so only the
+    running sum of those (invested) needs carrying from one trade to the next
+    """
+    trades = np.where(buys, strategy.tradeSize, 0.0)
+    for i in np.flatnonzero(buys | sells):
+        if buys[i]:
+            invested += strategy.tradeSize / growth[i]
+        elif growth[i] * invested >= strategy.minimum:
+            invested -= strategy.tradeSize / growth[i]
+            trades[i] = -strategy.tradeSize
+    return trades
+
+
+def initialState():
+    return BacktestState(np.empty(0), np.empty(0), None, START, 0.0, 0.0)
+
+
+def carried(initial, steps):
+    """
+    initial followed by the running sum of steps, added up in order so that carrying the total from one chunk
+    to the next gives the same sums as one pass
+    """
+    return np.cumsum(np.concatenate([[initial], steps]))[1:]
+
+
+def backtest(prices, volumes, strategy=STRATEGY, state=None):
+    """
+    Runs the strategy over price and volume columns, oldest first, returning a Backtest
+    Without a state the bars are the whole run, with one they carry on from the chunk that returned it,
+    and the series cover every bar from the first with full windows
+    """
+    start = firstMinute(strategy)
+    if state is None:
+        if len(prices) <= start:
+            raise ValueError("Need more than {} bars to fill the windows, got {}".format(start, len(prices)))
+        state = initialState()
+    prices = np.concatenate([state.prices, np.asarray(prices, dtype=float)])
+    volumes = np.concatenate([state.volumes, np.asarray(volumes, dtype=float)])
+    history = len(state.prices)
+    if len(prices) <= start:
+        # Not enough bars yet to fill the windows, they're all kept for the next chunk
+        empty = np.empty(0)
+        return Backtest(0, empty, empty, empty, empty, empty, empty, empty,
+                        state._replace(prices=prices, volumes=volumes))
+    basePrice = prices[start] if state.basePrice is None else state.basePrice
+    movingAverage, buys, sells = signals(prices, volumes, strategy)
+    growth = prices[start:] / basePrice
+    trades = settleSales(growth, buys, sells, strategy, state.invested)
+    invested = carried(state.invested, trades / growth)
+    trialAdded = carried(state.trialAdded, trades)
+    maxAdded = np.maximum.accumulate(np.maximum(trialAdded, state.maxAdded))
+    benchmark = START * growth
+    # Copies, so the state doesn't hold on to the chunk it came from
+    state = BacktestState(prices[-start:].copy(), volumes[-start:].copy(), basePrice, float(invested[-1]),
+                          float(trialAdded[-1]), float(maxAdded[-1]))
+    return Backtest(start - history, movingAverage, trades, benchmark, growth * invested, trialAdded, maxAdded,
+                    growth * (maxAdded + START), state)
+
+
+def streamBacktest(paths, strategy=STRATEGY, chunkSize=CHUNK_SIZE, cacheDir=None):
+    """
+    Runs the strategy over the bars of every file in paths (see price_data.priceFiles) in chunks of chunkSize bars,
+    yielding the PriceColumns of each chunk and its Backtest, so memory use depends on the chunk size and not
+    on the number of files
+    The last Backtest's values are those of the whole run, with the series of every chunk together
+    matching backtest() over all the bars
+    """
+    state = initialState()
+    for chunk in iterChunks(paths, chunkSize, cacheDir):
+        result = backtest(chunk.price, chunk.volume, strategy, state)
+        state = result.state
+        yield chunk, result
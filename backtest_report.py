@@ -0,0 +1,169 @@
+"""
+Reporting for backtest.py runs, in place of printing every minute
+    EquityCurves  the adjusted benchmark, trial, added (the float) and maxAdded of every minute with its timestamp,
+                  written into columns preallocated in a memory mapped .npy file laid out like price_data's cache
+    Summary       total return, max drawdown, trade count and exposure, built up chunk by chunk
+    Progress      a line on stderr every so many minutes
+printMinutes keeps the original four lines a minute for when every value is wanted
+Each takes the Backtest of a chunk at a time, so they work the same on a whole run or a stream of chunks
+"""
+import sys
+
+import numpy as np
+
+from backtest import START
+
+CURVE_COLUMNS = ("benchmark", "trial", "added", "maxAdded")
+
+
+class EquityCurves:
+    """
+    Curves of length minutes, filled in order by add() straight into the file at path
+    """
+
+    def __init__(self, path, length):
+        dtype = [("timestamp", np.int64, (length,))] + [(name, np.float64, (length,)) for name in CURVE_COLUMNS]
+        self.record = np.lib.format.open_memmap(path, mode="w+", dtype=np.dtype(dtype), shape=())
+        self.length = length
+        self.filled = 0
+
+    def add(self, result, timestamps):
+        """
+        Appends the minutes of a Backtest, timestamps being those of the bars it was run on
+        """
+        end = self.filled + len(result.trial)
+        if end > self.length:
+            raise ValueError("{} minutes don't fit in curves of {}".format(end, self.length))
+        filling = slice(self.filled, end)
+        self.record["timestamp"][filling] = timestamps[result.start:]
+        for name, values in zip(CURVE_COLUMNS, (result.benchmarkAdjusted, result.trial, result.trialAdded,
+                                                result.maxAdded)):
+            self.record[name][filling] = values
+        self.filled = end
+
+    def close(self):
+        self.record.flush()
+        if self.filled < self.length:
+            raise ValueError("Only {} of {} minutes were added".format(self.filled, self.length))
+
+
+def loadCurves(path):
+    """
+    {column: read only memory mapped array} of an EquityCurves file, timestamp included
+    """
+    record = np.load(path, mmap_mode="r")
+    return {name: record[name] for name in record.dtype.names}
+
+
+class Summary:
+    """
+    Statistics of a run, updated with each Backtest in turn
+        totalReturn     return on the capital the adjusted benchmark is given (START plus maxAdded), counting what
+                        of it isn't in the trial at the end (maxAdded less trialAdded) as cash, so it stays meaningful
+                        after taking out more than was put in
+        benchmarkReturn growth of the benchmark
+        excessReturn    final trial over the final adjusted benchmark
+        maxDrawdown     largest fall from a peak of the account's time weighted return, the account being the trial
+                        plus the cash totalReturn counts, with money newly added to it left out of each minute's return
+        exposure        mean money put in over the most ever put in (START plus maxAdded), the share of the adjusted
+                        benchmark's capital the trial actually had at work
+    """
+
+    def __init__(self):
+        self.minutes = 0
+        self.buys = 0
+        self.sells = 0
+        self.committed = 0.0
+        # Account value and maxAdded at the end of the last minute, and the time weighted return so far
+        self.account = START
+        self.maxAdded = 0.0
+        self.growth = 1.0
+        self.peak = 1.0
+        self.maxDrawdown = 0.0
+        self.last = None
+
+    def update(self, result):
+        if not len(result.trial):
+            return
+        self.minutes += len(result.trial)
+        self.buys += int(np.count_nonzero(result.trades > 0))
+        self.sells += int(np.count_nonzero(result.trades < 0))
+        self.committed += float(np.sum(START + result.trialAdded))
+        account = result.trial + result.maxAdded - result.trialAdded
+        added = np.diff(result.maxAdded, prepend=self.maxAdded)
+        previous = np.concatenate([[self.account], account[:-1]])
+        growth = self.growth * np.cumprod((account - added) / previous)
+        peaks = np.maximum.accumulate(np.maximum(growth, self.peak))
+        self.maxDrawdown = max(self.maxDrawdown, float(np.max(1 - growth / peaks)))
+        self.account, self.maxAdded = float(account[-1]), float(result.maxAdded[-1])
+        self.growth, self.peak = float(growth[-1]), float(peaks[-1])
+        self.last = result
+
+    def summary(self):
+        if self.last is None:
+            return {"minutes": 0}
+        trial = float(self.last.trial[-1])
+        added = float(self.last.trialAdded[-1])
+        maxAdded = float(self.last.maxAdded[-1])
+        capital = START + maxAdded
+        return {
+            "minutes": self.minutes,
+            "trades": self.buys + self.sells,
+            "buys": self.buys,
+            "sells": self.sells,
+            "trial": trial,
+            "benchmarkAdjusted": float(self.last.benchmarkAdjusted[-1]),
+            "totalReturn": (trial + maxAdded - added) / capital - 1,
+            "benchmarkReturn": float(self.last.benchmark[-1]) / START - 1,
+            "excessReturn": trial / float(self.last.benchmarkAdjusted[-1]) - 1,
+            "maxDrawdown": self.maxDrawdown,
+            "exposure": self.committed / self.minutes / capital,
+        }
+
+    def printSummary(self):
+        summary = self.summary()
+        if not summary["minutes"]:
+            print("No minutes with full windows")
+            return
+        print("Minutes: {}".format(summary["minutes"]))
+        print("Trades: {} ({} buys, {} sells)".format(summary["trades"], summary["buys"], summary["sells"]))
+        print("Trial: {:.2f}, adjusted benchmark: {:.2f}".format(summary["trial"], summary["benchmarkAdjusted"]))
+        print("Total return: {:.2%}, benchmark: {:.2%}, over the adjusted benchmark: {:.2%}"
+              .format(summary["totalReturn"], summary["benchmarkReturn"], summary["excessReturn"]))
+        print("Max drawdown: {:.2%}".format(summary["maxDrawdown"]))
+        print("Exposure: {:.2%}".format(summary["exposure"]))
+
+
+class Progress:
+    """
+    Prints a line to stderr each time another interval minutes are done, interval 0 or None prints nothing
+    """
+
+    def __init__(self, interval, total=None):
+        self.interval = interval
+        self.total = total
+        self.minutes = 0
+
+    def update(self, result):
+        done = self.minutes + len(result.trial)
+        if self.interval:
+            total = " of {}".format(self.total) if self.total is not None else ""
+            # Every multiple of interval reached within the chunk, with the values at that minute
+            for minute in range((self.minutes // self.interval + 1) * self.interval, done + 1, self.interval):
+                i = minute - self.minutes - 1
+                print("{}{} minutes, trial {:.2f}, adjusted benchmark {:.2f}"
+                      .format(minute, total, result.trial[i], result.benchmarkAdjusted[i]), file=sys.stderr)
+        self.minutes = done
+
+
+def printMinutes(result):
+    """
+    The original per minute output of btc_pattern
+    """
+    for benchmark, trial, added, maxAdded, average in zip(result.benchmarkAdjusted.tolist(), result.trial.tolist(),
+                                                          result.trialAdded.tolist(), result.maxAdded.tolist(),
+                                                          result.movingAverage.tolist()):
+        print("Benchmark:", benchmark)
+        print("Trial1:", trial, added)
+        print("Max Float:", maxAdded)
+        print("Moving Average:", average)
@@ -0,0 +1,97 @@
+"""
+Baseline strategies to compare the real_estate simulation against
+Each baseline puts the same monthly additions the simulation gets to work some other way over the same
+Data.months + 1 months, adding them at the start of each month and growing them to the end of it as Data does:
+    indexFund   invested in the stock market at growth
+    savings     kept in a high yield savings account at SAVINGS_RATE (or the set's "savings" key)
+    prepayment  paid off the mortgage of one property bought with the set's cost, down, interest and amortization,
+                then, once it's cleared, invested in the stock market along with the mortgage payment it frees up
+                for as long as the mortgage would otherwise have run
+Every baseline is worked out for all the sets at once, returning the (total assets, cash flow) of each
+so they line up with getResults and can be plotted as curves over a sweep
+"""
+import numpy as np
+
+from real_estate_batch import MONTHS, monthlyRates, parameterColumns
+
+# Annual rate of the high yield savings account, in percent, when a set has no "savings" key
+SAVINGS_RATE = 4.0
+STRATEGIES = ("indexFund", "savings", "prepayment")
+
+
+def contributionValue(additions, monthlyRate, months):
+    """
+    Value after months of adding additions each month and growing by monthlyRate, in closed form
+    """
+    growth = 1 + monthlyRate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = additions * growth * (growth ** months - 1) / monthlyRate
+    return np.where(monthlyRate == 0, additions * months, value)
+
+
+def growingBaseline(additions, annualRate, months):
+    """
+    (total assets, cash flow) of contributions growing at annualRate, the cash flow being a month's growth
+    """
+    monthlyRate = monthlyRates(annualRate)
+    value = contributionValue(additions, monthlyRate, months)
+    return np.column_stack([value, value * monthlyRate])
+
+
+def indexFund(p, months=MONTHS):
+    return growingBaseline(p["additions"], p["growth"], months + 1)
+
+
+def savings(p, months=MONTHS, rate=SAVINGS_RATE):
+    return growingBaseline(p["additions"], p.get("savings", np.full_like(p["additions"], rate)), months + 1)
+
+
+def prepayment(p, months=MONTHS):
+    """
+    Total assets are the debt paid off ahead of the regular schedule plus the stock market fund,
+    cash flow is a month's growth on the fund plus any mortgage payment no longer being made
+    """
+    rate = monthlyRates(p["interest"])
+    growth = 1 + monthlyRates(p["growth"])
+    periods = p["amortization"] * 12
+    balance = p["cost"] * 1000 * (1 - p["down"] / 100)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        compound = (1 + rate) ** periods
+        payment = np.where(rate == 0, balance / periods, balance * rate * compound / (compound - 1))
+    regular = balance.copy()
+    prepaid = balance.copy()
+    fund = np.zeros_like(balance)
+    for _ in range(months + 1):
+        owed = prepaid * (1 + rate) - payment - p["additions"]
+        freed = np.where(regular > 0, payment, 0)
+        # Until it's cleared everything goes on the mortgage, with any overpayment in the final month invested
+        inflow = np.where(prepaid > 0, np.maximum(-owed, 0), p["additions"] + freed)
+        fund = (fund + inflow) * growth
+        prepaid = np.where(prepaid > 0, np.maximum(owed, 0), 0)
+        regular = np.maximum(regular * (1 + rate) - payment, 0)
+    freed = np.where((prepaid == 0) & (regular > 0), payment, 0)
+    return np.column_stack([regular - prepaid + fund, fund * (growth - 1) + freed])
+
+
+def baselines(sets, months=MONTHS, strategies=STRATEGIES):
+    """
+    {strategy: (N, 2) array of (total assets, cash flow)} for every set
+    sets is a list of mainSet style dicts or a 2D array with one column per key in KEYS
+    """
+    p = parameterColumns(sets)
+    if not isinstance(sets, np.ndarray) and all("savings" in s for s in sets):
+        p["savings"] = np.array([s["savings"] for s in sets], dtype=float)
+    functions = {"indexFund": indexFund, "savings": savings, "prepayment": prepayment}
+    return {strategy: functions[strategy](p, months) for strategy in strategies}
+
+
+def sweepBaselines(mainSet, variables, xpoints, months=MONTHS, strategies=STRATEGIES):
+    """
+    Baselines at every point of a runSimulation sweep, without jitter
+    Returns {strategy: (len(variables), len(xpoints), 2) array}
+    """
+    from real_estate import sweepSet
+    noJitter = dict.fromkeys(mainSet, 1.0)
+    sets = [sweepSet(mainSet, key, i, noJitter) for key in variables for i in xpoints]
+    return {strategy: values.reshape(len(variables), len(xpoints), 2)
+            for strategy, values in baselines(sets, months, strategies).items()}
@@ -0,0 +1,188 @@
+"""
+Benchmark suite for the real_estate simulator
+Times single scenarios at a range of portfolio sizes, the buy check (minimumDown), full single runs
+(getCashFlow, stepped and with time skipping) and a fixed runSimulation sweep grid, with the scalar and the batch engine
+Runs headless and reports throughput in scenario-months per second
+Results can be saved as a JSON baseline, and compared against one to flag regressions
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from real_estate import Data, evaluateSets, getCashFlow, getResults, mainSet, sweepSets
+
+PORTFOLIO_SIZES = (1, 10, 100, 1000, 10000)
+# Months simulated per repeat of a portfolio benchmark
+PORTFOLIO_MONTHS = 60
+# Variables and x points of the sweep grid, one seeded trial per point
+SWEEP_VARIABLES = [[("holdTime", 1)], [("interest", 1)], [("down", 1)], [("amortization", 0)]]
+SWEEP_XPOINTS = np.array([m / 100 for m in range(50, 200, 5)])
+SWEEP_SEED = 0
+
+
+def portfolioData(size):
+    """
+    A Data part way through a run, holding size properties of every age up to its hold time
+    so a few are listed and sold each month, much like a real run
+    """
+    data = Data(mainSet)
+    data.setMonthlyRates()
+    data.holdTime = mainSet["holdTime"]
+    factor = data.downPaymentSteps()[0][1]
+    holdMonths = int(data.holdTime * 12)
+    for i in range(size):
+        age = i % holdMonths
+        value = data.cost * 1000 * (1 + data.monthlyMarketRate) ** age
+        owing = data.cost * 1000 * (1 - data.down / 100)
+        data.properties.add(value, owing, data.monthlyMarketRate, data.monthlyInterestRate, factor, age=age)
+        data.mortgageTotal += factor
+        data.equityTotal += value - owing
+        data.unlistedCount += 1
+    data.cash = 0
+    data.month = holdMonths
+    return data
+
+
+def timeIt(run, setup=None, repeat=5):
+    """
+    Best and median wall time of repeat calls of run(setup())
+    setup isn't timed, so each call can start from a fresh state
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.median(times))
+
+
+def benchPortfolio(size, repeat):
+    def run(data):
+        for _ in range(PORTFOLIO_MONTHS):
+            data.simulateMonth()
+            data.month += 1
+    return timeIt(run, lambda: portfolioData(size), repeat), PORTFOLIO_MONTHS
+
+
+def benchMinimumDown(repeat, calls=10000):
+    data = portfolioData(10)
+    rng = np.random.default_rng(0)
+    debts = (rng.random(calls) * 20000).tolist()
+    incomes = (5000 + rng.random(calls) * 40000).tolist()
+
+    def run(_):
+        for debt, income in zip(debts, incomes):
+            data.minimumDown(debt, income)
+    # Each call stands in for one month's buy check
+    return timeIt(run, repeat=repeat), calls
+
+
+def benchCashFlow(repeat):
+    return timeIt(lambda _: getCashFlow(mainSet), repeat=repeat), Data(mainSet).months + 1
+
+
+def benchSkipping(repeat):
+    return timeIt(lambda _: getResults(mainSet, skip=True), repeat=repeat), Data(mainSet).months + 1
+
+
+def benchSweep(repeat, batch):
+    sets = sweepSets(mainSet, SWEEP_VARIABLES, 1, SWEEP_XPOINTS, 1, SWEEP_SEED)
+    return timeIt(lambda _: evaluateSets(sets, batch=batch), repeat=repeat), len(sets) * (Data(mainSet).months + 1)
+
+
+def runBenchmarks(repeat=5, quick=False):
+    """
+    Runs every benchmark, returning {name: {"best", "median", "scenarioMonths", "throughput"}}
+    throughput is scenario-months per second of the best time
+    quick skips the largest portfolio and the scalar sweep
+    """
+    cases = [("portfolio/{}".format(size), lambda size=size: benchPortfolio(size, repeat))
+             for size in PORTFOLIO_SIZES if not (quick and size > 1000)]
+    cases += [
+        ("minimumDown", lambda: benchMinimumDown(repeat)),
+        ("getCashFlow", lambda: benchCashFlow(repeat)),
+        ("getResults/skip", lambda: benchSkipping(repeat)),
+        ("sweep/batch", lambda: benchSweep(repeat, True)),
+    ]
+    if not quick:
+        cases.append(("sweep/scalar", lambda: benchSweep(max(1, repeat // 2), False)))
+    results = {}
+    for name, case in cases:
+        (best, median), scenarioMonths = case()
+        results[name] = {"best": best, "median": median, "scenarioMonths": scenarioMonths,
+                         "throughput": scenarioMonths / best}
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Names of the benchmarks whose throughput fell by more than threshold (a fraction) against baseline
+    Benchmarks missing from either side are ignored
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline["results"]:
+            old = baseline["results"][name]["throughput"]
+            if result["throughput"] < old * (1 - threshold):
+                regressions.append(name)
+    return regressions
+
+
+def printResults(results, baseline=None, regressions=()):
+    print("{:<18}{:>12}{:>12}{:>20}{:>10}".format("benchmark", "best (s)", "median (s)", "scenario-months/s",
+                                                  "change"))
+    for name, result in results.items():
+        change = ""
+        if baseline is not None and name in baseline["results"]:
+            change = "{:+.1%}".format(result["throughput"] / baseline["results"][name]["throughput"] - 1)
+            change += " !" if name in regressions else ""
+        print("{:<18}{:>12.4f}{:>12.4f}{:>20.0f}{:>10}".format(name, result["best"], result["median"],
+                                                               result["throughput"], change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the real_estate simulator")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare the results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="throughput drop, as a fraction, counted as a regression (default 0.1)")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per benchmark, the best is kept")
+    parser.add_argument("--quick", action="store_true", help="skip the slowest benchmarks")
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(args.repeat, args.quick)
+    baseline, regressions = None, []
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+    printResults(results, baseline, regressions)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2)
+    if regressions:
+        print("\nRegressions beyond {:.0%}: {}".format(args.threshold, ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
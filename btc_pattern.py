@@ -1,59 +1,42 @@
-import csv
-import datetime
+import argparse
+import sys
 
-data = []
-with open('gemini_BTCUSD_2020_1min.csv') as csvfile:
-    spamreader = csv.reader(csvfile, delimiter=',')
-    for row in spamreader:
-        dataPoint = {}
-        dataPoint['timestamp'] = datetime.datetime.strptime(row[1], '%Y-%m-%d %H:%M:%S')
-        dataPoint['price'] = float(row[3])
-        dataPoint['volume'] = float(row[7])
-        data.append(dataPoint)
+from backtest import STRATEGY, firstMinute, streamBacktest
+from backtest_report import EquityCurves, Progress, Summary, printMinutes
+from price_data import CHUNK_SIZE, barCount
 
-dataReversed = []
-for i in range(len(data)-1, 0, -1):
-    dataReversed.append(data[i])
+PRICES = 'gemini_BTCUSD_2020_1min.csv'
 
-benchmark = 1000.0
-trial1 = 1000.0
-trial1Added = 0.0
-prevValue = dataReversed[20]['price']
-maxAdded = 0
-num = 0
-for i in range(20, len(dataReversed)):
-    dataPoint = dataReversed[i]
-    price = dataPoint['price']
-    volume = dataPoint['volume']
-    multiplier = price / prevValue
-    benchmark = benchmark*multiplier
-    trial1 = trial1*multiplier
-    prevMovingAverage = sum([p['price'] for p in dataReversed[i-20:i-10]])/10.0
-    movingAverage = sum([p['price'] for p in dataReversed[i-10:i]])/10.0
-    volumeAverage = sum([p['volume'] for p in dataReversed[i-20:i]])/20.0
-    movingAverageAngle = movingAverage/prevMovingAverage
 
-    # print(benchmark)
-    if volume > volumeAverage*3:
-        
-        if movingAverageAngle > 1.01:
-            
-            trial1 = trial1 + 100.0
-            trial1Added = trial1Added + 100.0
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the volume spike / moving average angle strategy")
+    parser.add_argument("prices", nargs="*", default=[PRICES],
+                        help="minute bar CSVs or glob patterns, read in order of their first bar (default {})"
+                        .format(PRICES))
+    parser.add_argument("--curves", help="write the equity curves to this .npy file")
+    parser.add_argument("--progress", type=int, default=0, help="print progress every this many minutes")
+    parser.add_argument("--verbose", action="store_true", help="print the benchmark, trial and float every minute")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bars read at a time")
+    parser.add_argument("--cache-dir", help="directory for the price caches (default next to each CSV)")
+    args = parser.parse_args(argv)
 
-        if movingAverageAngle < 0.99 and trial1 >= 10:
-            trial1 = trial1 - 100.0
-            trial1Added = trial1Added - 100.0
+    # Bars are streamed oldest first from the cached columns (see price_data.py and backtest.py)
+    minutes = max(barCount(args.prices, args.cache_dir) - firstMinute(STRATEGY), 0)
+    curves = EquityCurves(args.curves, minutes) if args.curves else None
+    summary = Summary()
+    progress = Progress(args.progress, minutes)
+    for chunk, result in streamBacktest(args.prices, STRATEGY, args.chunk_size, args.cache_dir):
+        if curves is not None:
+            curves.add(result, chunk.timestamp)
+        summary.update(result)
+        progress.update(result)
+        if args.verbose:
+            printMinutes(result)
+    if curves is not None:
+        curves.close()
+    summary.printSummary()
+    return 0
 
-    maxAdded = max(maxAdded, trial1Added)
-    benchmarkPercentUp = benchmark/1000.0
-    benchMarkAdjusted = benchmarkPercentUp * (maxAdded + 1000.0)
-    
-    print("Benchmark:", benchMarkAdjusted)
-    print("Trial1:", trial1, trial1Added)
-    print("Max Float:", maxAdded)
-    print("Moving Average:", movingAverage)
 
-    prevValue = dataPoint['price']
-    
-# print(num)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
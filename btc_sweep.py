@@ -0,0 +1,158 @@
+"""
+Parameter sweep of the btc_pattern strategy
+Runs backtest.py over a grid or a random sample of Strategy values, split over a pool of worker processes,
+and writes one row per strategy to a CSV ranked by its final return over the adjusted benchmark
+
+    python btc_sweep.py gemini_BTCUSD_2020_1min.csv -o sweep.csv --workers 4
+    python btc_sweep.py gemini_BTCUSD_2020_1min.csv -o sweep.csv --grid window=5,10,20 --grid volumeMultiplier=2,3,4
+    python btc_sweep.py gemini_BTCUSD_2020_1min.csv -o sweep.csv --samples 500 --seed 1
+
+The price columns are parsed once into price_data's cache before the pool starts, and every worker memory maps
+that same file, so the CSV is never parsed again and the pages are shared between processes
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import STRATEGY, Strategy, backtest
+from price_data import loadPrices
+
+# Values tried for each Strategy field by default, fields left out keep their STRATEGY value
+GRID = {
+    "window": [5, 10, 20],
+    "volumeWindow": [10, 20, 40],
+    "volumeMultiplier": [2.0, 3.0, 4.0],
+    "buyAngle": [1.005, 1.01, 1.02],
+    "sellAngle": [0.98, 0.99, 0.995],
+    "tradeSize": [50.0, 100.0, 200.0],
+}
+# Ranges (low, high) random samples are drawn from, windows are whole numbers of bars
+RANGES = {
+    "window": (2, 60),
+    "volumeWindow": (5, 120),
+    "volumeMultiplier": (1.5, 6.0),
+    "buyAngle": (1.001, 1.03),
+    "sellAngle": (0.97, 0.999),
+    "tradeSize": (10.0, 500.0),
+}
+INTEGER_FIELDS = ("window", "volumeWindow")
+RESULT_FIELDS = Strategy._fields + ("excessReturn", "trial", "benchmarkAdjusted", "maxAdded", "trades")
+
+# Price columns of the worker process, set by loadShared
+shared = {}
+
+
+def gridStrategies(grid=GRID, base=STRATEGY):
+    """
+    Every combination of the values in grid, as Strategy tuples
+    """
+    keys = list(grid)
+    return [base._replace(**dict(zip(keys, values))) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def sampleStrategies(count, ranges=RANGES, base=STRATEGY, seed=0):
+    """
+    count Strategy tuples with every field in ranges drawn uniformly from its range
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for key, (low, high) in ranges.items():
+        if key in INTEGER_FIELDS:
+            columns[key] = rng.integers(low, high, count, endpoint=True).tolist()
+        else:
+            columns[key] = (low + rng.random(count) * (high - low)).tolist()
+    return [base._replace(**{key: values[i] for key, values in columns.items()}) for i in range(count)]
+
+
+def loadShared(path, cacheDir=None):
+    shared["columns"] = loadPrices(path, cacheDir)
+
+
+def scoreStrategy(strategy, columns):
+    """
+    Result row of one strategy: its fields, then how far the trial finished above the adjusted benchmark
+    as a fraction of it, the final trial and adjusted benchmark, the most added and the number of trades
+    """
+    result = backtest(columns.price, columns.volume, strategy)
+    trial, benchmark = float(result.trial[-1]), float(result.benchmarkAdjusted[-1])
+    return tuple(strategy) + (trial / benchmark - 1, trial, benchmark, float(result.maxAdded[-1]),
+                              int(np.count_nonzero(result.trades)))
+
+
+def scoreChunk(strategies):
+    return [scoreStrategy(strategy, shared["columns"]) for strategy in strategies]
+
+
+def sweep(path, strategies, workers=1, cacheDir=None):
+    """
+    Result rows (see RESULT_FIELDS) of every strategy, best excess return first
+    workers=None uses every core
+    """
+    workers = os.cpu_count() if workers is None else workers
+    # Builds the cache here so the workers only ever map it
+    loadShared(path, cacheDir)
+    if workers <= 1 or len(strategies) <= 1:
+        rows = scoreChunk(strategies)
+    else:
+        # A few chunks per worker evens out strategies with long windows
+        size = math.ceil(len(strategies) / (4 * workers))
+        chunks = [strategies[i:i + size] for i in range(0, len(strategies), size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=loadShared, initargs=(path, cacheDir)) as pool:
+            rows = [row for chunk in pool.map(scoreChunk, chunks) for row in chunk]
+    excess = RESULT_FIELDS.index("excessReturn")
+    return sorted(rows, key=lambda row: row[excess], reverse=True)
+
+
+def writeResults(rows, output):
+    with open(output, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(RESULT_FIELDS)
+        writer.writerows(rows)
+
+
+def parseGrid(items):
+    """
+    {field: values} from "field=value,value,..." strings
+    """
+    grid = {}
+    for item in items:
+        key, _, values = item.partition("=")
+        if key not in Strategy._fields or not values:
+            raise ValueError("Expected field=value,value,... with a field from {}, got {}"
+                             .format(", ".join(Strategy._fields), item))
+        kind = int if key in INTEGER_FIELDS else float
+        grid[key] = [kind(value) for value in values.split(",")]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the btc_pattern strategy's parameters")
+    parser.add_argument("prices", help="minute bar CSV, as read by price_data.loadPrices")
+    parser.add_argument("-o", "--output", required=True, help="CSV file for the ranked results")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="field=value,value,... to sweep, can be repeated (default GRID)")
+    parser.add_argument("--samples", type=int, help="draw this many random strategies from RANGES instead")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random sample")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for every core")
+    parser.add_argument("--cache-dir", help="directory for the price cache (default next to the CSV)")
+    args = parser.parse_args(argv)
+
+    if args.samples:
+        strategies = sampleStrategies(args.samples, seed=args.seed)
+    else:
+        strategies = gridStrategies(parseGrid(args.grid) if args.grid else GRID)
+    rows = sweep(args.prices, strategies, args.workers or None, args.cache_dir)
+    writeResults(rows, args.output)
+    for row in rows[:5]:
+        print(", ".join("{}={:g}".format(key, value) for key, value in zip(RESULT_FIELDS, row)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Event sinks for the real_estate simulator
+Data reports every purchase, listing, sale and refinance to its sink as a typed event tuple
+Sinks decide what happens to them: nothing, an in-memory ring buffer, a JSONL file or the old printed text
+"""
+import json
+import sys
+from collections import deque, namedtuple
+
+
+class Purchase(namedtuple("Purchase", "month price down")):
+    __slots__ = ()
+
+    def __str__(self):
+        return "Month {}: Purchase ${} property at {}% down".format(*self)
+
+
+class Listing(namedtuple("Listing", "month age value")):
+    __slots__ = ()
+
+    def __str__(self):
+        return "Month {}: List {} month old property for ${}".format(*self)
+
+
+class Sale(namedtuple("Sale", "month age value")):
+    __slots__ = ()
+
+    def __str__(self):
+        return "Month {}: Sell {} month old property for ${}".format(*self)
+
+
+class HomeEquityLoan(namedtuple("HomeEquityLoan", "month released age mortgageChange")):
+    __slots__ = ()
+
+    def __str__(self):
+        return "Month {}: Release ${} from {} month old property in home equity loan, raising mortgage " \
+               "payment by ${} ".format(*self)
+
+
+class Refinance(namedtuple("Refinance", "month age mortgageChange")):
+    __slots__ = ()
+
+    def __str__(self):
+        return "Month {}: Refinance {} month old property, lowering mortgage by ${}".format(*self)
+
+
+class SilentSink:
+    """
+    Drops every event
+    Data checks enabled before building an event, so a silent run does no formatting at all
+    """
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class TextSink(SilentSink):
+    """
+    Prints each event as the human readable line the simulator has always printed
+    """
+    enabled = True
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event):
+        print(event, file=self.stream if self.stream is not None else sys.stdout)
+
+
+class RingBufferSink(SilentSink):
+    """
+    Keeps the last maxlen events in memory as tuples
+    """
+    enabled = True
+
+    def __init__(self, maxlen=10000):
+        self.events = deque(maxlen=maxlen)
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class JsonlSink(SilentSink):
+    """
+    Appends events to a JSONL file, one {"kind": ..., fields...} object per line
+    Lines are buffered and written bufferSize at a time, call close (or use as a context manager) to flush the rest
+    """
+    enabled = True
+
+    def __init__(self, path, bufferSize=1000):
+        self.file = open(path, "a")
+        self.bufferSize = bufferSize
+        self.buffer = []
+
+    def emit(self, event):
+        record = {"kind": type(event).__name__}
+        record.update(event._asdict())
+        self.buffer.append(json.dumps(record))
+        if len(self.buffer) >= self.bufferSize:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,173 @@
+"""
+Rolling window indicators for btc_pattern and other backtests
+Each indicator comes in two forms:
+    a batch function over a whole array, value i covering the window ending at (and including) element i,
+    with nan until the first window is full
+    an incremental class updated one tick at a time in constant time, for data arriving bar by bar
+rollingSum(..., exact=True) adds each window's values up oldest first, exactly as sum() over the matching slice
+does, so strategies written with slice sums give bit for bit the same answers. Otherwise sums come from a
+cumulative sum, which costs the same for any window but can differ from the slice sums in the last few bits
+"""
+import math
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Block length of the batch EMA, each block is solved with one small matrix product
+EMA_BLOCK = 64
+
+
+def rollingSum(values, window, exact=False):
+    """
+    Sum of each window of values
+    exact adds the window's values one at a time oldest first (window passes over the array),
+    otherwise the sums are differences of a cumulative sum (one pass whatever the window)
+    """
+    values = np.asarray(values, dtype=float)
+    sums = np.full(len(values), np.nan)
+    if len(values) < window:
+        return sums
+    if exact:
+        view = sliding_window_view(values, window)
+        total = view[:, 0].copy()
+        for k in range(1, window):
+            total += view[:, k]
+        sums[window - 1:] = total
+    else:
+        cumulative = np.concatenate([[0.0], np.cumsum(values)])
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def sma(values, window, exact=False):
+    """
+    Simple moving average, also used for the rolling mean volume
+    """
+    return rollingSum(values, window, exact) / window
+
+
+def rollingStd(values, window, ddof=0):
+    """
+    Standard deviation of each window, from window sums of the values and their squares
+    Values are centred on their overall mean first, and the sums are exact ones, since a cumulative sum of
+    squares loses too many bits to the cancellation
+    """
+    values = np.asarray(values, dtype=float)
+    centred = values - (values.mean() if len(values) else 0.0)
+    sums = rollingSum(centred, window, exact=True)
+    squares = rollingSum(centred * centred, window, exact=True)
+    variance = (squares - sums * sums / window) / (window - ddof)
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def alphaFor(span):
+    return 2 / (span + 1)
+
+
+def ema(values, span=None, alpha=None):
+    """
+    Exponential moving average, ema[0] = values[0] and ema[i] = alpha * values[i] + (1 - alpha) * ema[i - 1]
+    Give either span (alpha = 2 / (span + 1)) or alpha
+    Solved EMA_BLOCK values at a time: every block is first averaged from zero with one matrix product,
+    then the value carried in from the block before is added back with its decay
+    """
+    alpha = alphaFor(span) if alpha is None else alpha
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if not n:
+        return values.copy()
+    block = EMA_BLOCK
+    blocks = math.ceil(n / block)
+    padded = np.zeros(blocks * block)
+    padded[:n] = values
+    lags = np.arange(block)[:, None] - np.arange(block)[None, :]
+    weights = np.where(lags >= 0, alpha * (1 - alpha) ** np.maximum(lags, 0), 0.0)
+    partial = padded.reshape(blocks, block) @ weights.T
+    decay = (1 - alpha) ** np.arange(1, block + 1)
+    carried = np.empty(blocks)
+    carry = values[0]
+    for b in range(blocks):
+        carried[b] = carry
+        carry = partial[b, -1] + decay[-1] * carry
+    return (partial + carried[:, None] * decay[None, :]).ravel()[:n]
+
+
+class RollingMean:
+    """
+    Mean of the last window values, updated in constant time
+    A compensated running sum keeps it in step with summing the window afresh
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, x):
+        # Neumaier summation, so adding and removing values doesn't let rounding build up
+        total = self.total + x
+        if abs(self.total) >= abs(x):
+            self.compensation += (self.total - total) + x
+        else:
+            self.compensation += (x - total) + self.total
+        self.total = total
+
+    def update(self, value):
+        """
+        Adds the next value and returns the new mean, nan until the window is full
+        """
+        self.values.append(value)
+        self.add(value)
+        if len(self.values) > self.window:
+            self.add(-self.values.popleft())
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return math.nan
+        return (self.total + self.compensation) / self.window
+
+
+class RollingStd(RollingMean):
+    """
+    Standard deviation of the last window values, updated in constant time from running sums of the values
+    and their squares, both taken about the first value seen so the squares stay small
+    """
+
+    def __init__(self, window, ddof=0):
+        super().__init__(window)
+        self.ddof = ddof
+        self.shift = None
+        self.squares = RollingMean(window)
+
+    def update(self, value):
+        if self.shift is None:
+            self.shift = value
+        super().update(value - self.shift)
+        self.squares.update((value - self.shift) ** 2)
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return math.nan
+        mean = (self.total + self.compensation) / self.window
+        squares = (self.squares.total + self.squares.compensation) / self.window
+        return math.sqrt(max(squares - mean * mean, 0) * self.window / (self.window - self.ddof))
+
+
+class Ema:
+    """
+    Exponential moving average updated one value at a time, matching ema()
+    """
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alphaFor(span) if alpha is None else alpha
+        self.value = math.nan
+
+    def update(self, value):
+        self.value = value if math.isnan(self.value) else self.alpha * value + (1 - self.alpha) * self.value
+        return self.value
@@ -1 +1,115 @@
-# Time representation
+"""
+Monte Carlo engine for the real_estate model
+Simulates many paths at once with the vectorized batch engine, each path following its own monthly
+housing market growth, interest rate, occupancy and stock market growth,
+and summarises total assets and cash flow over time as percentile bands
+Stock market growth is a random monthly return whose mean is the mainSet rate's monthly return,
+so the noise widens the bands without moving their centre
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+
+from real_estate import mainSet
+from real_estate_batch import KEYS, MONTHS, monthlyRates, simulateBatch
+
+# How each stochastic parameter moves from month to month, in the units of its mainSet value:
+# (volatility of the monthly shock, fraction of the gap to the mainSet value closed each month, lowest, highest)
+# A reversion of 1 draws every month independently around the mainSet value
+# Keys in RETURNS are instead drawn as lognormal monthly returns, given as (annual volatility in percent,)
+PROCESSES = {
+    "market": (0.5, 0.05, -50.0, 100.0),
+    "interest": (0.15, 0.03, 0.1, 25.0),
+    "occupancy": (1.0, 0.2, 0.0, 100.0),
+    "growth": (15.0,),
+}
+RETURNS = ("growth",)
+
+
+def meanReverting(rng, paths, months, mean, volatility, reversion, lowest, highest):
+    """
+    Samples a mean reverting (discrete Ornstein-Uhlenbeck) process for every path at once
+    x[t + 1] = x[t] + reversion * (mean - x[t]) + volatility * N(0, 1), clipped to [lowest, highest]
+    Every path starts at the mean, returns a (paths, months + 1) array
+    """
+    values = np.empty((paths, months + 1))
+    values[:, 0] = mean
+    shocks = rng.standard_normal((paths, months)) * volatility
+    for month in range(months):
+        previous = values[:, month]
+        np.clip(previous + reversion * (mean - previous) + shocks[:, month], lowest, highest,
+                out=values[:, month + 1])
+    return values
+
+
+def lognormalReturns(rng, paths, months, rate, volatility):
+    """
+    Samples independent monthly returns around an annual rate for every path at once
+    Each month's growth factor is lognormal with a log volatility of volatility / sqrt(12) and a mean of the
+    rate's own monthly factor, so averaging over paths gives back the constant rate
+    Returns the annual rate each month's factor compounds to, as simulateBatch expects, a (paths, months + 1) array
+    """
+    logVolatility = volatility / 100 / np.sqrt(12)
+    shocks = rng.standard_normal((paths, months + 1)) * logVolatility
+    factors = (1 + monthlyRates(np.float64(rate))) * np.exp(shocks - logVolatility ** 2 / 2)
+    return (factors ** 12 - 1) * 100
+
+
+def samplePaths(params, paths, months=MONTHS, processes=None, rng=None):
+    """
+    Draws a schedule for every stochastic parameter, ready to pass to simulateBatch
+    processes defaults to PROCESSES, leaving a parameter out keeps it constant
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    processes = PROCESSES if processes is None else processes
+    return {key: (lognormalReturns if key in RETURNS else meanReverting)(rng, paths, months, params[key], *process)
+            for key, process in processes.items()}
+
+
+def runMonteCarlo(params=None, paths=10000, months=MONTHS, processes=None, seed=0, chunk=10000,
+                  percentiles=(5, 50, 95)):
+    """
+    Simulates paths scenarios of params, each with its own randomly drawn rate schedules
+    Paths are run chunk at a time, each chunk drawing from its own generator spawned from seed,
+    so a given seed and chunk size always give the same answer
+    Returns a dict of (len(percentiles), months + 1) "totalAssets" and "cashFlow" bands,
+    plus the "final" values of every path as an (paths, 2) array
+    """
+    params = mainSet if params is None else params
+    row = np.array([params[key] for key in KEYS], dtype=float)
+    totalAssets = np.empty((paths, months + 1), dtype=np.float32)
+    cashFlow = np.empty((paths, months + 1), dtype=np.float32)
+    final = np.empty((paths, 2))
+    starts = range(0, paths, chunk)
+    generators = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(starts))]
+    for start, rng in zip(starts, generators):
+        size = min(chunk, paths - start)
+        schedules = samplePaths(params, size, months, processes, rng)
+        results, series = simulateBatch(np.tile(row, (size, 1)), months, schedules, record=True)
+        final[start:start + size] = results
+        totalAssets[start:start + size] = series["totalAssets"]
+        cashFlow[start:start + size] = series["cashFlow"]
+    return {
+        "percentiles": percentiles,
+        "totalAssets": np.percentile(totalAssets, percentiles, axis=0),
+        "cashFlow": np.percentile(cashFlow, percentiles, axis=0),
+        "final": final,
+    }
+
+
+def plotBands(bands, column="totalAssets"):
+    """
+    Plots the median of a runMonteCarlo column with the outer percentiles shaded around it
+    """
+    values = bands[column]
+    months = np.arange(values.shape[1])
+    plt.fill_between(months, values[0], values[-1], alpha=0.3)
+    plt.plot(months, values[len(values) // 2])
+    plt.legend(["P{}".format(bands["percentiles"][len(values) // 2]),
+                "P{} - P{}".format(bands["percentiles"][0], bands["percentiles"][-1])])
+    plt.xlabel("month")
+    plt.ylabel(column)
+    plt.show()
+
+
+if __name__ == "__main__":
+    plotBands(runMonteCarlo(mainSet, paths=10000, seed=0))
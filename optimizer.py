@@ -0,0 +1,103 @@
+"""
+Strategy optimizer for the real_estate model
+Searches the investor's own choices (how long to hold, how much to put down, how big a safety buffer,
+what DTI to stop at and the amortization period) for the strategy with the most total assets or cash flow
+at the end of the simulation, with everything about the market left at its mainSet value
+Uses differential evolution, a derivative free population method: each generation's candidates are
+simulated together with the batch engine, optionally spread over a process pool and behind a ResultCache
+"""
+import numpy as np
+
+from real_estate import evaluateSets, mainSet
+
+# Decision variables and the range searched for each
+# Data fixes its mortgage term at 100 years, so term never changes a result and isn't searched
+BOUNDS = {
+    "holdTime": (1.0, 20.0),
+    "down": (5.0, 100.0),
+    "safety": (0.0, 24.0),
+    "maxDTI": (10.0, 45.0),
+    "amortization": (5.0, 30.0),
+}
+
+
+def scoreSets(sets, workers=1, cache=None):
+    """
+    (total assets, cash flow, peak DTI) of every set, in order, simulated with the batch engine
+    and split over workers processes, with scores already in cache not simulated again
+    """
+    return evaluateSets(sets, batch=True, workers=workers, cache=cache, peakDTI=True)
+
+
+def optimize(mainSet=mainSet, cashFlow=False, bounds=None, maxPeakDTI=None, budget=3000, population=40,
+             mutation=0.7, crossover=0.9, seed=0, workers=1, cache=None, verbose=True):
+    """
+    Differential evolution (rand/1/bin) over the decision variables in bounds (defaults to BOUNDS),
+    maximising total assets, or cash flow when cashFlow is true
+    maxPeakDTI constrains the highest DTI reached in any month. Feasible candidates always beat infeasible
+    ones, which are ranked by how far over the limit they go
+    Stops once budget candidates have been evaluated (cached ones included)
+    Returns (best parameter set, its (total assets, cash flow, peak DTI), number of evaluations)
+    """
+    bounds = BOUNDS if bounds is None else bounds
+    keys = list(bounds)
+    low = np.array([bounds[key][0] for key in keys])
+    high = np.array([bounds[key][1] for key in keys])
+    rng = np.random.default_rng(seed)
+    column = 1 if cashFlow else 0
+
+    def toSets(points):
+        sets = []
+        for point in points:
+            tmpSet = dict(mainSet)
+            tmpSet.update(zip(keys, point.tolist()))
+            sets.append(tmpSet)
+        return sets
+
+    def fitness(scores):
+        # Higher is better: the objective when feasible, minus the violation (below every objective) when not
+        objective = np.array([score[column] for score in scores])
+        violation = np.array([max(score[2] - maxPeakDTI, 0) if maxPeakDTI is not None else 0.0 for score in scores])
+        return np.where(violation > 0, -np.inf, objective), violation
+
+    def better(newFit, newViolation, oldFit, oldViolation):
+        return np.where((newViolation == 0) & (oldViolation == 0), newFit >= oldFit, newViolation <= oldViolation)
+
+    members = low + rng.random((population, len(keys))) * (high - low)
+    scores = scoreSets(toSets(members), workers, cache)
+    fit, violation = fitness(scores)
+    evaluations = population
+    generation = 0
+    while evaluations < budget:
+        size = min(population, budget - evaluations)
+        trials = members.copy()
+        for i in range(size):
+            a, b, c = rng.choice([j for j in range(population) if j != i], 3, replace=False)
+            mutant = np.clip(members[a] + mutation * (members[b] - members[c]), low, high)
+            cross = rng.random(len(keys)) < crossover
+            cross[rng.integers(len(keys))] = True
+            trials[i] = np.where(cross, mutant, members[i])
+        trialScores = scoreSets(toSets(trials[:size]), workers, cache)
+        trialFit, trialViolation = fitness(trialScores)
+        replace = np.flatnonzero(better(trialFit, trialViolation, fit[:size], violation[:size]))
+        for i in replace:
+            members[i], scores[i] = trials[i], trialScores[i]
+            fit[i], violation[i] = trialFit[i], trialViolation[i]
+        evaluations += size
+        generation += 1
+        if verbose:
+            best = np.argmax(np.where(violation == 0, fit, -np.inf)) if (violation == 0).any() \
+                else np.argmin(violation)
+            print("Generation {}: {} evaluations, best {:.0f} at peak DTI {:.1f}"
+                  .format(generation, evaluations, scores[best][column], scores[best][2]))
+    best = np.argmax(np.where(violation == 0, fit, -np.inf)) if (violation == 0).any() else np.argmin(violation)
+    return toSets(members[best:best + 1])[0], scores[best], evaluations
+
+
+if __name__ == "__main__":
+    strategy, score, evaluations = optimize(mainSet, cashFlow=False, maxPeakDTI=40.0)
+    print()
+    for key in BOUNDS:
+        print("{}: {:.2f}".format(key, strategy[key]))
+    print("Total assets: {:.0f}, cash flow: {:.0f}, peak DTI: {:.1f} after {} evaluations"
+          .format(score[0], score[1], score[2], evaluations))
@@ -0,0 +1,138 @@
+"""
+Columnar loader for minute bar CSVs like gemini_BTCUSD_2020_1min.csv
+Parses the CSV once into int64 epoch timestamps and float64 price and volume columns in chronological order,
+and caches them next to it as a .npy file that's memory mapped on later loads,
+so a backtest starts instantly and every process reading it shares the same pages
+The cache's name records the CSV's size and modification time, so editing the CSV rebuilds it
+Data split over several files (one a year, say) can be read back in chunks across all of them with iterChunks
+"""
+import csv
+import glob
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+# Columns of the CSV holding the date, the price and the volume of each bar
+DATE_COLUMN = 1
+PRICE_COLUMN = 3
+VOLUME_COLUMN = 7
+
+# Bars per chunk read by iterChunks
+CHUNK_SIZE = 1 << 16
+
+PriceColumns = namedtuple("PriceColumns", "timestamp price volume")
+
+
+def parseCsv(path):
+    """
+    Reads the CSV into PriceColumns sorted oldest first
+    Rows that aren't bars (a header or a source line) are skipped
+    """
+    dates, prices, volumes = [], [], []
+    with open(path, newline="") as file:
+        for row in csv.reader(file):
+            try:
+                price, volume = float(row[PRICE_COLUMN]), float(row[VOLUME_COLUMN])
+            except (IndexError, ValueError):
+                continue
+            dates.append(row[DATE_COLUMN])
+            prices.append(price)
+            volumes.append(volume)
+    timestamp = np.array(dates, dtype="datetime64[s]").astype(np.int64)
+    price = np.array(prices, dtype=np.float64)
+    volume = np.array(volumes, dtype=np.float64)
+    if timestamp.size > 1 and np.all(timestamp[1:] <= timestamp[:-1]):
+        order = slice(None, None, -1)
+    else:
+        order = np.argsort(timestamp, kind="stable")
+    return PriceColumns(timestamp[order], price[order], volume[order])
+
+
+def cachePath(path, cacheDir=None):
+    stat = os.stat(path)
+    directory = os.path.dirname(os.path.abspath(path)) if cacheDir is None else cacheDir
+    return os.path.join(directory, "{}.{}-{}.npy".format(os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+
+
+def writeCache(columns, target):
+    """
+    Saves the columns as a single record whose fields are whole columns, so each stays contiguous on disk
+    Written to a temporary file and renamed into place, so a reader never sees half a cache
+    """
+    n = len(columns.timestamp)
+    record = np.empty((), dtype=[("timestamp", np.int64, (n,)), ("price", np.float64, (n,)),
+                                 ("volume", np.float64, (n,))])
+    for name in PriceColumns._fields:
+        record[name] = getattr(columns, name)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        np.save(file, record)
+    os.replace(temporary, target)
+
+
+def loadPrices(path, cacheDir=None, cache=True):
+    """
+    PriceColumns of the CSV at path, oldest bar first, read only
+    Uses the memory mapped cache when it's up to date, otherwise parses the CSV and rebuilds the cache,
+    removing caches of older versions of the file
+    cacheDir defaults to the CSV's directory, cache=False parses the CSV without touching any cache
+    """
+    if not cache:
+        return parseCsv(path)
+    target = cachePath(path, cacheDir)
+    if not os.path.exists(target):
+        columns = parseCsv(path)
+        for stale in glob.glob(os.path.join(os.path.dirname(target), glob.escape(os.path.basename(path)) + ".*.npy")):
+            os.remove(stale)
+        writeCache(columns, target)
+    record = np.load(target, mmap_mode="r")
+    return PriceColumns(*(record[name] for name in PriceColumns._fields))
+
+
+def priceFiles(patterns, cacheDir=None):
+    """
+    Files matching a glob pattern, or any of a list of patterns and paths, ordered by their first bar
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    if not paths:
+        raise ValueError("No files match {}".format(", ".join(patterns)))
+    firstBars = {}
+    for path in paths:
+        timestamp = loadPrices(path, cacheDir).timestamp
+        firstBars[path] = timestamp[0] if len(timestamp) else np.iinfo(np.int64).max
+    return sorted(paths, key=firstBars.get)
+
+
+def barCount(patterns, cacheDir=None):
+    """
+    Number of bars iterChunks yields for patterns, without reading them
+    """
+    count, last = 0, None
+    for path in priceFiles(patterns, cacheDir):
+        timestamp = loadPrices(path, cacheDir).timestamp
+        begin = 0 if last is None else int(np.searchsorted(timestamp, last, side="right"))
+        if begin < len(timestamp):
+            count += len(timestamp) - begin
+            last = timestamp[-1]
+    return count
+
+
+def iterChunks(patterns, chunkSize=CHUNK_SIZE, cacheDir=None):
+    """
+    Yields PriceColumns of at most chunkSize bars at a time from every file of priceFiles(patterns) in turn,
+    oldest first
+    Chunks are slices of each file's memory mapped cache, so only the chunk being worked on needs to be in memory
+    Bars no later than the last one yielded are dropped, so files overlapping at their ends don't repeat bars
+    """
+    last = None
+    for path in priceFiles(patterns, cacheDir):
+        columns = loadPrices(path, cacheDir)
+        begin = 0 if last is None else int(np.searchsorted(columns.timestamp, last, side="right"))
+        for start in range(begin, len(columns.timestamp), chunkSize):
+            chunk = PriceColumns(*(column[start:start + chunkSize] for column in columns))
+            last = chunk.timestamp[-1]
+            yield chunk
@@ -0,0 +1,78 @@
+"""
+Per-phase profiling for the real_estate simulator
+A PhaseProfiler attached to Data (data.profiler) times each phase of simulateMonth and counts what happened in it
+Data only checks whether a profiler is attached, so an unprofiled run pays nothing for this
+Profilers merge, so one can sum up every scenario of a sweep, across processes
+"""
+import time
+from collections import Counter
+
+# The phases of Data.simulateMonth, in the order they run, and the Data method running each
+PHASES = (
+    ("sell", "tryToSell"),
+    ("refinance", "tryToRefinance"),
+    ("buy", "tryToBuy"),
+    ("accrual", "accrue"),
+    ("totals", "updateTotals"),
+)
+
+
+class PhaseProfiler:
+    """
+    Wall time and calls per phase, plus counts of events (buys, listings, sales, refinances, home equity loans,
+    DTI searches and the steps each search walked) over every month and scenario it has seen
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys((name for name, _ in PHASES), 0.0)
+        self.calls = dict.fromkeys((name for name, _ in PHASES), 0)
+        self.counts = Counter()
+        self.scenarios = 0
+        self.months = 0
+
+    def runMonth(self, data):
+        """
+        Runs every phase of a month of data, timing each one
+        """
+        clock = time.perf_counter
+        for name, method in PHASES:
+            start = clock()
+            getattr(data, method)()
+            self.seconds[name] += clock() - start
+            self.calls[name] += 1
+        self.months += 1
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def merge(self, other):
+        """
+        Adds other's timings and counts to this profiler's
+        """
+        for name in self.seconds:
+            self.seconds[name] += other.seconds[name]
+            self.calls[name] += other.calls[name]
+        self.counts.update(other.counts)
+        self.scenarios += other.scenarios
+        self.months += other.months
+        return self
+
+    def summary(self):
+        """
+        The timings and counts as a printable table
+        """
+        total = sum(self.seconds.values())
+        lines = ["{} scenarios, {} months, {:.3f} s in simulateMonth".format(self.scenarios, self.months, total),
+                 "{:<12}{:>10}{:>8}{:>12}{:>14}".format("phase", "seconds", "share", "calls", "us per call")]
+        for name, _ in PHASES:
+            seconds, calls = self.seconds[name], self.calls[name]
+            lines.append("{:<12}{:>10.3f}{:>8.1%}{:>12}{:>14.2f}".format(
+                name, seconds, seconds / total if total else 0, calls, 1e6 * seconds / calls if calls else 0))
+        if self.counts:
+            lines.append("{:<18}{:>12}{:>14}".format("event", "count", "per scenario"))
+            for name, n in sorted(self.counts.items()):
+                lines.append("{:<18}{:>12}{:>14.1f}".format(name, n, n / self.scenarios if self.scenarios else 0))
+        return "\n".join(lines)
+
+    def printSummary(self):
+        print(self.summary())
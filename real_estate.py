@@ -1,9 +1,15 @@
+import functools
 import math
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 import matplotlib.pyplot as plt
 import numpy as np
 
+from events import HomeEquityLoan, Listing, Purchase, Refinance, Sale, SilentSink, TextSink
+from profiling import PhaseProfiler
+
 
 class Property:
     def __init__(self):
@@ -51,8 +57,212 @@ class Property:
             return 0, age, self.monthlyMortgage - startingMortgage
 
 
+def bookColumn(name):
+    """
+    Attribute of a PropertyView that reads and writes its row of the PropertyBook column
+    """
+    def get(view):
+        return getattr(view.book, name)[view.row()]
+
+    def set(view, value):
+        getattr(view.book, name)[view.row()] = value
+
+    return property(get, set)
+
+
+class PropertyView(Property):
+    """
+    A single property of a PropertyBook, usable anywhere a Property is
+    Remembers its purchase number rather than its row, so it stays valid when other properties are removed
+    """
+    value = bookColumn("value")
+    owing = bookColumn("owing")
+    age = bookColumn("age")
+    listed = bookColumn("listed")
+    listedTime = bookColumn("listedTime")
+    monthlyMarketRate = bookColumn("monthlyMarketRate")
+    monthlyInterestRate = bookColumn("monthlyInterestRate")
+    monthlyMortgage = bookColumn("monthlyMortgage")
+
+    def __init__(self, book, row):
+        self.book = book
+        self.cachedRow = row
+        self.purchase = book.purchase[row]
+
+    def row(self):
+        if self.cachedRow >= len(self.book) or self.book.purchase[self.cachedRow] != self.purchase:
+            self.cachedRow = int(np.flatnonzero(self.book.purchase[:len(self.book)] == self.purchase)[0])
+        return self.cachedRow
+
+
+# Up to this many properties, monthly accrual and selling go row by row through Python lists,
+# past it whole-column NumPy operations are faster
+SMALL_BOOK = 24
+
+
+class PropertyBook:
+    """
+    Portfolio of properties stored as parallel NumPy columns, one row per property
+    Rows [0, len) are live, removing a property moves the last row into its place
+    The purchase column numbers properties in the order they were added, which is the order iteration follows
+    """
+    COLUMNS = (("value", np.float64), ("owing", np.float64), ("age", np.int64), ("listed", np.bool_),
+               ("listedTime", np.int64), ("monthlyMarketRate", np.float64), ("monthlyInterestRate", np.float64),
+               ("monthlyMortgage", np.float64), ("purchase", np.int64))
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.purchases = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for row in self.purchaseOrder():
+            yield PropertyView(self, row)
+
+    def __getitem__(self, i):
+        return PropertyView(self, self.purchaseOrder()[i])
+
+    def column(self, name):
+        """
+        Live part of a column
+        """
+        return getattr(self, name)[:self.size]
+
+    def purchaseOrder(self):
+        """
+        Live rows sorted by purchase
+        """
+        return np.argsort(self.purchase[:self.size], kind="stable")
+
+    def add(self, value, owing, monthlyMarketRate, monthlyInterestRate, monthlyMortgage, age=0, listed=False,
+            listedTime=0):
+        """
+        Adds a property, growing the columns when full, and returns its row
+        """
+        if self.size == len(self.value):
+            for name, _ in self.COLUMNS:
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        row = self.size
+        self.value[row] = value
+        self.owing[row] = owing
+        self.age[row] = age
+        self.listed[row] = listed
+        self.listedTime[row] = listedTime
+        self.monthlyMarketRate[row] = monthlyMarketRate
+        self.monthlyInterestRate[row] = monthlyInterestRate
+        self.monthlyMortgage[row] = monthlyMortgage
+        self.purchase[row] = self.purchases
+        self.purchases += 1
+        self.size += 1
+        return row
+
+    def append(self, property):
+        """
+        Adds a copy of a Property
+        """
+        self.add(property.value, property.owing, property.monthlyMarketRate, property.monthlyInterestRate,
+                 property.monthlyMortgage, property.age, property.listed, property.listedTime)
+
+    def remove(self, property):
+        self.removeRow(property.row())
+
+    def copy(self):
+        """
+        Independent copy of the book, copying each column array rather than any per-property objects
+        """
+        book = PropertyBook.__new__(PropertyBook)
+        book.size = self.size
+        book.purchases = self.purchases
+        for name, _ in self.COLUMNS:
+            setattr(book, name, getattr(self, name).copy())
+        return book
+
+    def removeRow(self, row):
+        """
+        Removes a row by moving the last live row into it
+        """
+        last = self.size - 1
+        if row != last:
+            for name, _ in self.COLUMNS:
+                column = getattr(self, name)
+                column[row] = column[last]
+        self.size = last
+
+    def simulateMonth(self, monthlyMarketRate=None):
+        """
+        Property.simulateMonth for every property at once
+        monthlyMarketRate, when given, grows every property at that rate instead of each one's own
+        Returns the change in total equity
+        Books of up to SMALL_BOOK properties go row by row instead (see simulateRows)
+        """
+        n = self.size
+        if n <= SMALL_BOOK:
+            return self.simulateRows(monthlyMarketRate)
+        listed, owing, value = self.listed[:n], self.owing[:n], self.value[:n]
+        self.age[:n] += 1
+        self.listedTime[:n] += listed
+        remaining = owing - (self.monthlyMortgage[:n] - owing * self.monthlyInterestRate[:n])
+        np.maximum(remaining, 0, out=remaining)
+        grown = value * (1 + (self.monthlyMarketRate[:n] if monthlyMarketRate is None else monthlyMarketRate))
+        np.copyto(grown, value, where=listed)
+        change = grown.sum() - value.sum() + owing.sum() - remaining.sum()
+        owing[:] = remaining
+        value[:] = grown
+        return change
+
+    def simulateRows(self, monthlyMarketRate=None):
+        """
+        simulateMonth with the columns read into Python lists, the same arithmetic a row at a time
+        For a handful of properties this avoids the fixed cost of each whole-column NumPy operation
+        """
+        n = self.size
+        listed, owing, value = self.listed[:n].tolist(), self.owing[:n].tolist(), self.value[:n].tolist()
+        rates = self.monthlyMarketRate[:n].tolist() if monthlyMarketRate is None else [monthlyMarketRate] * n
+        remaining = [max(owed - (mortgage - owed * rate), 0.0) for owed, mortgage, rate in
+                     zip(owing, self.monthlyMortgage[:n].tolist(), self.monthlyInterestRate[:n].tolist())]
+        grown = [worth if isListed else worth * (1 + rate) for worth, isListed, rate in zip(value, listed, rates)]
+        self.age[:n] += 1
+        if True in listed:
+            self.listedTime[:n] += self.listed[:n]
+        self.owing[:n] = remaining
+        self.value[:n] = grown
+        return sum(grown) - sum(value) + sum(owing) - sum(remaining)
+
+
+def removalSkips(alive, act):
+    """
+    Data.tryToSell goes through the properties in purchase order and removes each one it sells,
+    which has always made it skip the property right after a sale until the next month.
+    Given which properties are live and which would sell if visited (act), along the last axis in purchase order,
+    returns the live ones that get skipped: every second one in a run of consecutive sales
+    """
+    brk = alive & ~act
+    cumAlive = np.cumsum(alive, axis=-1)
+    lastBreak = np.maximum.accumulate(np.where(brk, cumAlive, 0), axis=-1)
+    lastBreakBefore = np.zeros_like(lastBreak)
+    lastBreakBefore[..., 1:] = lastBreak[..., :-1]
+    return alive & ((cumAlive - 1 - lastBreakBefore) % 2 == 1)
+
+
+def removalSkipsRow(act):
+    """
+    removalSkips for one portfolio with every property live, as a list
+    """
+    skipped = []
+    skipNext = False
+    for sells in act:
+        skipped.append(skipNext)
+        skipNext = sells and not skipNext
+    return skipped
+
+
 class Data:
-    def __init__(self, mapper):
+    def __init__(self, mapper, events=None, schedule=None):
 
         self.term = 100
         self.holdTime = mapper["holdTime"]
@@ -84,53 +294,189 @@ class Data:
         self.monthlyGrowthRate = 0
         self.monthlyMarketRate = 0
 
-        self.properties = []
+        self.properties = PropertyBook()
         self.cash = 0
         self.emergencyFund = 0
         self.DTI = 0
         self.month = 0
 
+        self.downSteps = []
+        self.downStepsKey = None
+
+        # Running totals over self.properties, kept up to date on every buy, sell, refinance and monthly accrual
+        self.mortgageTotal = 0
+        self.equityTotal = 0
+        self.unlistedCount = 0
+        # No property can be listed or sold before nextSale, or refinanced before nextRefinance,
+        # so tryToSell and tryToRefinance skip the months before them
+        self.nextSale = 0
+        self.nextRefinance = 0
+        # When set, simulateMonth checks the running totals against a full recompute every month
+        self.checkTotals = False
+        # Where purchases, listings, sales and refinances are reported, see events.py
+        self.events = events if events is not None else SilentSink()
+        # Optional profiling.PhaseProfiler timing each phase of simulateMonth and counting what happens in it
+        self.profiler = None
+        # Optional schedules.RateSchedule replacing interest, market, growth, rent and occupancy month by month
+        # A mortgage keeps the interest rate of the month it was taken out, everything else follows the month
+        if schedule is not None and schedule.months < self.months:
+            raise ValueError("The schedule covers {} months but the simulation runs {}".format(schedule.months,
+                                                                                          self.months))
+        self.schedule = schedule
+
+    def snapshot(self):
+        """
+        The whole state of the simulation: parameters, month, cash, running totals and a copy of the properties
+        Restoring it into any Data continues the run exactly from this point
+        The events sink and profiler aren't part of the state
+        """
+        state = {key: value for key, value in self.__dict__.items() if key not in ("properties", "events", "profiler")}
+        state["properties"] = self.properties.copy()
+        return state
+
+    def restore(self, snapshot):
+        """
+        Puts this Data back into the state of a snapshot, which stays untouched so it can be restored again
+        """
+        self.__dict__.update(snapshot)
+        self.properties = snapshot["properties"].copy()
+
+    def fork(self, events=None):
+        """
+        A new Data continuing from this one's current state, reporting to events (nothing by default)
+        """
+        data = Data.__new__(Data)
+        data.restore(self.snapshot())
+        data.events = events if events is not None else SilentSink()
+        data.profiler = None
+        return data
+
+    def update(self, changes):
+        """
+        Changes parameters part way through a run, {attribute: new value}
+        Monthly rates are recalculated, so new purchases use the new interest rate
+        while properties already held keep their own rates
+        """
+        for key, value in changes.items():
+            if key not in self.__dict__ or key in ("properties", "events", "profiler"):
+                raise ValueError("Data has no parameter {}".format(key))
+            setattr(self, key, value)
+        self.nextSale = self.nextRefinance = self.month
+        self.setMonthlyRates()
+
     def setMonthlyRates(self):
         self.monthlyInterestRate = calculateMonthlyInterestRate(self.interest)
         self.monthlyGrowthRate = calculateMonthlyInterestRate(self.growth)
         self.monthlyMarketRate = calculateMonthlyInterestRate(self.market)
+        if self.schedule is not None:
+            self.scheduledRates(self.month)
+
+    def scheduledRates(self, month):
+        """
+        Takes the scheduled values, and their precomputed monthly rates, for month
+        """
+        for name, values in self.schedule.attributes.items():
+            setattr(self, name, values[month])
 
     def tryToSell(self):
         """
         Attempts to sell any eligible properties
         Lists any properties that are ready to be listed
         Sells any listed properties that are ready to sell
+        Before nextSale there's nothing to do, and the portfolio isn't looked at
         """
-        for property in self.properties:
-            if not property.listed and property.age >= self.holdTime * 12:
-                property.listed = True
-                property.listedTime = 0
-                print("Month {}: List {} month old property for ${}".format(self.month, property.age, property.value))
-            if property.listed and property.listedTime >= self.time:
-                equity = property.value - property.owing
+        if self.month < self.nextSale:
+            return
+        book = self.properties
+        order = book.purchaseOrder()
+        if len(order) <= SMALL_BOOK:
+            # A few properties go quicker as Python lists than through whole-array operations
+            listed = book.listed[order].tolist()
+            ready = [not isListed and age >= self.holdTime * 12
+                     for isListed, age in zip(listed, book.age[order].tolist())]
+            due = [isListed and listedTime >= self.time
+                   for isListed, listedTime in zip(listed, book.listedTime[order].tolist())]
+            act = [(isReady and 0 >= self.time) or isDue for isReady, isDue in zip(ready, due)]
+            visits = [i for i, skipped in enumerate(removalSkipsRow(act)) if (ready[i] or act[i]) and not skipped]
+        else:
+            listed = book.listed[order]
+            ready = (book.age[order] >= self.holdTime * 12) & ~listed
+            due = (book.listedTime[order] >= self.time) & listed
+            act = (ready & (0 >= self.time)) | due
+            skipped = removalSkips(np.ones(len(order), dtype=bool), act)
+            visits = np.flatnonzero((ready | act) & ~skipped)
+        listings = 0
+        sold = []
+        for i in visits:
+            row = order[i]
+            if ready[i]:
+                book.listed[row] = True
+                book.listedTime[row] = 0
+                self.unlistedCount -= 1
+                listings += 1
+                if self.events.enabled:
+                    self.events.emit(Listing(self.month, int(book.age[row]), float(book.value[row])))
+            if act[i]:
+                equity = book.value[row] - book.owing[row]
                 self.cash += equity
-                self.properties.remove(property)
-                print("Month {}: Sell {} month old property for ${}".format(self.month, property.age, property.value))
+                self.mortgageTotal -= book.monthlyMortgage[row]
+                self.equityTotal -= equity
+                sold.append(row)
+                if self.events.enabled:
+                    self.events.emit(Sale(self.month, int(book.age[row]), float(book.value[row])))
+        for row in sorted(sold, reverse=True):
+            book.removeRow(row)
+        self.nextSale = self.month + self.saleWait()
+        if self.profiler is not None:
+            self.profiler.count("listings", listings)
+            self.profiler.count("sales", len(sold))
         return
 
+    def saleWait(self):
+        """
+        Months from now until the next property can be listed or sold, infinite with none held
+        Waits only shrink as ages and listing times grow, so the oldest of each kind is the one to wait for
+        A refinance only resets an age, so it never brings that month closer
+        """
+        book = self.properties
+        listed = book.column("listed")
+        oldest = (book.column("age").max(where=~listed, initial=-1), self.holdTime * 12)
+        longest = (book.column("listedTime").max(where=listed, initial=-1), self.time)
+        return min([monthsUntil(int(count), threshold) for count, threshold in (oldest, longest) if count >= 0],
+                   default=math.inf)
+
     def tryToRefinance(self):
         """
         Go through all the properties and check if any are eligible for refinance
         They are eligible if they are not listed and have been held longer than the mortgage term
         We get a home equity loan during refinance if it's advisable
+        Before nextRefinance there's nothing to do, and the portfolio isn't looked at
         """
-        for property in self.properties:
-            if not property.listed and property.age >= self.term * 12:
-                if self.shouldDoHomeEquityLoan(property):
-                    realized, age, diff = property.refinance(True)
-                    self.cash += realized
-                    print("Month {}: Release ${} from {} month old property in home equity loan, raising mortgage "
-                          "payment by ${} "
-                          .format(self.month, realized, age, diff))
-                else:
-                    _, age, diff = property.refinance(False)
-                    print("Month {}: Refinance {} month old property, lowering mortgage by ${}"
-                          .format(self.month, age, diff))
+        if self.month < self.nextRefinance:
+            return
+        book = self.properties
+        eligible = np.flatnonzero(~book.column("listed") & (book.column("age") >= self.term * 12))
+        for row in eligible[np.argsort(book.purchase[eligible], kind="stable")]:
+            property = PropertyView(book, row)
+            owing = property.owing
+            if self.shouldDoHomeEquityLoan(property):
+                realized, age, diff = property.refinance(True)
+                self.cash += realized
+                self.mortgageTotal += diff
+                self.equityTotal -= property.owing - owing
+                if self.events.enabled:
+                    self.events.emit(HomeEquityLoan(self.month, float(realized), int(age), float(diff)))
+                if self.profiler is not None:
+                    self.profiler.count("homeEquityLoans")
+            else:
+                _, age, diff = property.refinance(False)
+                self.mortgageTotal += diff
+                if self.events.enabled:
+                    self.events.emit(Refinance(self.month, int(age), float(diff)))
+                if self.profiler is not None:
+                    self.profiler.count("refinances")
+        oldest = book.column("age").max(where=~book.column("listed"), initial=-1)
+        self.nextRefinance = self.month + (monthsUntil(int(oldest), self.term * 12) if oldest >= 0 else math.inf)
 
     def tryToBuy(self):
         """
@@ -138,23 +484,25 @@ class Data:
         Purchases a property if DTI can remain below max and can afford monthly expenses for safety period
         Favours minimal down payments
         """
-        currentDebt = sum(
-            [self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties]) + self.expenses
-        currentMonthlyIncome = (len(self.properties) * (self.occupancy / 100) * self.rent) + self.income / 12
+        currentDebt = self.monthlyExpensesTotal() + self.expenses
+        currentMonthlyIncome = self.monthlyRevenue() + self.income / 12
         down, monthlyMortgage = self.minimumDown(currentDebt, currentMonthlyIncome)
         if down is not None and self.canAffordProperty(monthlyMortgage, down):
-            property = Property()
-            property.value = (self.cost * 1000)
-            property.owing = (self.cost * 1000 * (1 - down / 100))
-            property.monthlyMarketRate = self.monthlyMarketRate
-            property.monthlyInterestRate = self.monthlyInterestRate
-            property.monthlyMortgage = monthlyMortgage
-            self.properties.append(property)
+            value = (self.cost * 1000)
+            owing = (self.cost * 1000 * (1 - down / 100))
+            self.properties.add(value, owing, self.monthlyMarketRate, self.monthlyInterestRate, monthlyMortgage)
+            self.nextSale = min(self.nextSale, self.month + max(math.ceil(self.holdTime * 12), 0))
+            self.nextRefinance = min(self.nextRefinance, self.month + max(math.ceil(self.term * 12), 0))
+            self.mortgageTotal += monthlyMortgage
+            self.equityTotal += value - owing
+            self.unlistedCount += 1
             self.cash -= (self.cost * 1000 * down / 100) + self.monthlyExpensesCostPerProperty(
                 monthlyMortgage) * self.safety
             self.emergencyFund += self.monthlyExpensesCostPerProperty(monthlyMortgage) * self.safety
-            print("Month {}: Purchase ${} property at {}% down"
-                  .format(self.month, self.cost * 1000, down))
+            if self.events.enabled:
+                self.events.emit(Purchase(self.month, self.cost * 1000, down))
+            if self.profiler is not None:
+                self.profiler.count("buys")
         return
 
     def minimumDown(self, currentMonthlyDebt, currentMonthlyIncome):
@@ -162,16 +510,51 @@ class Data:
         Finds the minimum down payment possible to purchase a property while
         remaining below the max DTI
         Returns (down payment as a percent, monthly mortgage payment)
+        Solves for the lowest down payment directly and then checks its neighbours in the table of 1% steps,
+        giving the same answer as trying every step in turn since the DTI only falls as the down payment rises
         """
-        down = self.down
-        while True:
-            if down > 100:
-                return None, None
-            potentialDTI = self.calculatePotentialDTI(currentMonthlyDebt, currentMonthlyIncome, down)
-            if potentialDTI <= self.maxDTI:
-                return down, monthlyMortgageCostForProperty(self.cost, down, self.monthlyInterestRate,
-                                                            self.amortization)
-            down += 1
+        steps = self.downPaymentSteps()
+        addedIncome = self.rent * self.occupancy / 100
+
+        def withinDTI(i):
+            addedExpense = self.monthlyExpensesCostPerProperty(steps[i][1])
+            return calculateDTI(currentMonthlyDebt + addedExpense, currentMonthlyIncome + addedIncome) <= self.maxDTI
+
+        i = 0
+        numerator, denominator = amortizationFactor(self.monthlyInterestRate, self.amortization)
+        if steps and numerator * self.cost > 0:
+            headroom = self.maxDTI * (currentMonthlyIncome + addedIncome) / 100 - currentMonthlyDebt - \
+                       self.monthlyExpensesCostPerProperty(0)
+            lowest = 100 * (1 - headroom * denominator / (self.cost * 1000 * numerator))
+            if math.isfinite(lowest):
+                i = min(max(math.ceil(lowest - self.down), 0), len(steps))
+        start = i
+        while i < len(steps) and not withinDTI(i):
+            i += 1
+        while i > 0 and withinDTI(i - 1):
+            i -= 1
+        if self.profiler is not None:
+            self.profiler.count("dtiSearches")
+            self.profiler.count("dtiSearchSteps", abs(i - start))
+        if i == len(steps):
+            return None, None
+        return steps[i]
+
+    def downPaymentSteps(self):
+        """
+        The (down payment, monthly mortgage) pairs minimumDown can choose from, 1% apart from self.down up to 100%
+        Rebuilt only when the cost, down payment, interest rate or amortization change
+        """
+        key = (self.cost, self.down, self.monthlyInterestRate, self.amortization)
+        if key != self.downStepsKey:
+            self.downSteps = []
+            down = self.down
+            while down <= 100:
+                self.downSteps.append((down, monthlyMortgageCostForProperty(self.cost, down, self.monthlyInterestRate,
+                                                                            self.amortization)))
+                down += 1
+            self.downStepsKey = key
+        return self.downSteps
 
     def canAffordProperty(self, monthlyMortgage, down, extra=0):
         """
@@ -180,21 +563,34 @@ class Data:
         return self.cash + extra >= (self.cost * 1000 * down / 100) + \
                self.monthlyExpensesCostPerProperty(monthlyMortgage) * self.safety
 
+    def metrics(self):
+        """
+        Current values of SERIES_COLUMNS
+        With no properties equity and debt are the integer 0 that summing over none gave in the original report,
+        rather than whatever the running totals were left at
+        """
+        if len(self.properties):
+            equity = self.equityTotal
+            debt = self.monthlyExpensesTotal()
+        else:
+            equity = debt = 0
+        revenue = self.monthlyRevenue()
+        return self.cash, equity, self.emergencyFund, self.cash + equity + self.emergencyFund, self.DTI, \
+            revenue, debt, revenue - debt, len(self.properties)
+
     def buildReport(self):
+        cash, equity, emergencyFund, totalAssets, DTI, revenue, debt, cashFlow, properties = self.metrics()
         print()
         print("-----Month " + str(self.month) + " -----")
-        print("     Properties:", len(self.properties))
-        print("     Cash:", str(self.cash))
-        print("     Equity:", str(sum([(p.value - p.owing) for p in self.properties])))
-        print("     Emergency Fund:", str(self.emergencyFund))
-        print("     Total Assets:",
-              str(self.cash + sum([(p.value - p.owing) for p in self.properties]) + self.emergencyFund))
-        print("     DTI:", str(self.DTI))
-        print("     Revenue:", str(len(self.properties) * (self.occupancy / 100) * self.rent))
-        print("     Debt:", str(sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties])))
-        print("     Cash Flow:", str((len(self.properties) * (self.occupancy / 100) * self.rent) -
-                                     sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in
-                                          self.properties])))
+        print("     Properties:", properties)
+        print("     Cash:", str(cash))
+        print("     Equity:", str(equity))
+        print("     Emergency Fund:", str(emergencyFund))
+        print("     Total Assets:", str(totalAssets))
+        print("     DTI:", str(DTI))
+        print("     Revenue:", str(revenue))
+        print("     Debt:", str(debt))
+        print("     Cash Flow:", str(cashFlow))
         print()
         #
         # for property in self.properties:
@@ -219,7 +615,11 @@ class Data:
         self.monthlyInterestRate = 0
         self.monthlyGrowthRate = 0
         self.monthlyMarketRate = 0
-        self.properties = []
+        self.properties = PropertyBook()
+        self.mortgageTotal = 0
+        self.equityTotal = 0
+        self.unlistedCount = 0
+        self.nextSale = self.nextRefinance = 0
         self.cash = 0
         self.emergencyFund = 0
         self.DTI = 0
@@ -236,22 +636,175 @@ class Data:
         5. Calculate cash from monthly additions, rent, mortgages, expenses
         6. Calculate growth of cash and emergency fund
         7. Calculate new DTI
+        With a profiler attached it runs the same phases, timing each one
+        """
+        if self.schedule is not None:
+            self.scheduledRates(self.month)
+        if self.profiler is not None:
+            self.profiler.runMonth(self)
+        else:
+            self.tryToSell()
+            self.tryToRefinance()
+            self.tryToBuy()
+            self.accrue()
+            self.updateTotals()
+        if self.checkTotals:
+            self.verifyTotals()
+        return
+
+    def accrue(self):
+        """
+        A month of appreciation, listing time and mortgage payments on every property
+        """
+        scheduled = self.schedule is not None and "market" in self.schedule
+        self.equityTotal += self.properties.simulateMonth(self.monthlyMarketRate if scheduled else None)
+
+    def updateTotals(self):
+        """
+        The month's cash flow, growth of cash and emergency fund, and the new DTI
         """
-        self.tryToSell()
-        self.tryToRefinance()
-        self.tryToBuy()
-        for property in self.properties:
-            property.simulateMonth()
         self.cash += self.additions
-        self.cash -= sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties])
-        self.cash += (self.occupancy / 100) * self.rent * len([p for p in self.properties if not p.listed])
+        self.cash -= self.monthlyExpensesTotal()
+        self.cash += (self.occupancy / 100) * self.rent * self.unlistedCount
         self.cash = self.cash * (1 + self.monthlyGrowthRate)
         self.emergencyFund = self.emergencyFund * (1 + self.monthlyGrowthRate)
         self.DTI = calculateDTI(
-            sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties]) + self.expenses,
-            (len(self.properties) * (self.occupancy / 100) * self.rent) + self.income / 12
+            self.monthlyExpensesTotal() + self.expenses,
+            self.monthlyRevenue() + self.income / 12
         )
-        return
+
+    def quietMonths(self, limit):
+        """
+        How many months from now, up to limit, nothing can be listed, sold, refinanced or bought
+        The first month cash reaches the next purchase follows by stepping cash alone, exactly as updateTotals does,
+        since the down payment it needs can't change while the portfolio doesn't
+        Listing, sale and refinance months follow from the ages and listing times
+        With a schedule the purchase is checked again every month at that month's rates
+        """
+        quiet = limit
+        varying = self.schedule is not None
+        cash = self.cash
+        for month in range(limit):
+            if varying:
+                self.scheduledRates(self.month + month)
+            if varying or month == 0:
+                needed = self.purchaseNeeded()
+                if needed is None and not varying:
+                    break
+            if needed is not None and cash >= needed:
+                quiet = month
+                break
+            cash = self.nextCash(cash)
+        if varying:
+            self.scheduledRates(self.month)
+        book = self.properties
+        if quiet and book.size:
+            age, listedTime, listed = book.column("age"), book.column("listedTime"), book.column("listed")
+            unlisted = age[~listed]
+            waits = [waitUntil(unlisted, self.holdTime * 12), waitUntil(listedTime[listed], self.time),
+                     waitUntil(unlisted, self.term * 12)]
+            quiet = min([quiet] + [int(wait.min()) for wait in waits if wait.size])
+        return quiet
+
+    def purchaseNeeded(self):
+        """
+        Cash tryToBuy needs to buy the next property as things stand, None if the DTI rules out buying at all
+        """
+        currentDebt = self.monthlyExpensesTotal() + self.expenses
+        currentMonthlyIncome = self.monthlyRevenue() + self.income / 12
+        down, monthlyMortgage = self.minimumDown(currentDebt, currentMonthlyIncome)
+        if down is None:
+            return None
+        return (self.cost * 1000 * down / 100) + self.monthlyExpensesCostPerProperty(monthlyMortgage) * self.safety
+
+    def nextCash(self, cash):
+        """
+        Cash a month later with the portfolio unchanged, the same arithmetic as updateTotals
+        """
+        cash += self.additions
+        cash -= self.monthlyExpensesTotal()
+        cash += (self.occupancy / 100) * self.rent * self.unlistedCount
+        return cash * (1 + self.monthlyGrowthRate)
+
+    def skipMonths(self, months):
+        """
+        Jumps over months in which nothing is bought, listed, sold or refinanced (see quietMonths)
+        Values compound and mortgages amortize in closed form, cash and the emergency fund are stepped
+        A scheduled market rate compounds through the schedule's cumulative growth
+        """
+        book = self.properties
+        n = book.size
+        if n:
+            listed, owing, value = book.listed[:n], book.owing[:n], book.value[:n]
+            rate, payment = book.monthlyInterestRate[:n], book.monthlyMortgage[:n]
+            compound = (1 + rate) ** months
+            paid = np.divide(compound - 1, rate, out=np.full(n, float(months)), where=rate != 0)
+            remaining = np.maximum(owing * compound - payment * paid, 0)
+            if self.schedule is not None and "market" in self.schedule:
+                grown = value * self.schedule.growth("market", self.month, self.month + months)
+            else:
+                grown = value * (1 + book.monthlyMarketRate[:n]) ** months
+            np.copyto(grown, value, where=listed)
+            self.equityTotal += grown.sum() - value.sum() + owing.sum() - remaining.sum()
+            owing[:] = remaining
+            value[:] = grown
+            book.age[:n] += months
+            book.listedTime[:n] += listed * months
+        for month in range(self.month, self.month + months):
+            if self.schedule is not None:
+                self.scheduledRates(month)
+            self.cash = self.nextCash(self.cash)
+            self.emergencyFund = self.emergencyFund * (1 + self.monthlyGrowthRate)
+        self.DTI = calculateDTI(
+            self.monthlyExpensesTotal() + self.expenses,
+            self.monthlyRevenue() + self.income / 12
+        )
+        self.month += months
+        if self.profiler is not None:
+            self.profiler.count("skippedMonths", months)
+        if self.checkTotals:
+            self.verifyTotals()
+
+    def runSkipping(self):
+        """
+        Runs to the end of the simulation, stepping only the months something can happen in
+        and jumping straight over the quiet months between them
+        Gives the same final results as stepping every month
+        """
+        while self.month <= self.months:
+            quiet = self.quietMonths(self.months + 1 - self.month)
+            if quiet:
+                self.skipMonths(quiet)
+            if self.month <= self.months:
+                self.simulateMonth()
+                self.month += 1
+
+    def monthlyExpensesTotal(self):
+        """
+        Sum of monthly expenses over all properties, from the running mortgage total
+        """
+        return len(self.properties) * self.monthlyExpensesCostPerProperty(0) + self.mortgageTotal
+
+    def monthlyRevenue(self):
+        """
+        Rent expected from all properties, listed or not (as counted for DTI)
+        """
+        return len(self.properties) * (self.occupancy / 100) * self.rent
+
+    def verifyTotals(self):
+        """
+        Recomputes the running totals from the properties and raises if any has drifted from it
+        """
+        book = self.properties
+        expected = {
+            "mortgageTotal": book.column("monthlyMortgage").sum(),
+            "equityTotal": (book.column("value") - book.column("owing")).sum(),
+            "unlistedCount": np.count_nonzero(~book.column("listed")),
+        }
+        for name, value in expected.items():
+            if not math.isclose(getattr(self, name), value, rel_tol=1e-9, abs_tol=1e-6):
+                raise RuntimeError("Month {}: running {} is {} but the properties add up to {}"
+                                   .format(self.month, name, getattr(self, name), value))
 
     def monthlyExpensesCostPerProperty(self, monthlyMortgage):
         """
@@ -280,19 +833,22 @@ class Data:
         If the cash released from the refinance is enough to purchase another property
         while keeping DTI below max, it returns true
         """
-        currentDebt = sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties]) + \
-                      self.expenses
+        currentDebt = self.monthlyExpensesTotal() + self.expenses
         homeEquityDebt = monthlyMortgageCostForProperty(
             (_property.value - _property.owing)*0.8/1000, 0, _property.monthlyInterestRate, self.amortization)
-        currentMonthlyIncome = (len(self.properties) * (self.occupancy / 100) * self.rent) + self.income / 12
+        currentMonthlyIncome = self.monthlyRevenue() + self.income / 12
         released = (_property.value - _property.owing)*0.8
         down, monthlyMortgage = self.minimumDown(currentDebt + homeEquityDebt, currentMonthlyIncome)
         return down is not None and self.canAffordProperty(monthlyMortgage, down, released)
 
     def results(self):
-        return self.cash + sum([(p.value - p.owing) for p in self.properties]) + self.emergencyFund, \
-               (len(self.properties) * (self.occupancy / 100) * self.rent) - \
-               sum([self.monthlyExpensesCostPerProperty(p.monthlyMortgage) for p in self.properties])
+        _, _, _, totalAssets, _, _, _, cashFlow, _ = self.metrics()
+        return totalAssets, cashFlow
+
+
+# Monthly values recorded by simulate, in the order returned by Data.metrics
+SERIES_COLUMNS = ("cash", "equity", "emergencyFund", "totalAssets", "DTI", "revenue", "debt", "cashFlow",
+                  "properties")
 
 
 def calculateDTI(debt, income):
@@ -304,6 +860,26 @@ def calculateDTI(debt, income):
     return (debt / income) * 100
 
 
+def waitUntil(counts, threshold):
+    """
+    Months until each count, going up by one a month, first reaches threshold (0 if it already has)
+    """
+    wait = np.ceil(threshold - counts)
+    wait -= counts + wait - 1 >= threshold
+    wait += counts + wait < threshold
+    return np.maximum(wait, 0)
+
+
+def monthsUntil(count, threshold):
+    """
+    waitUntil for a single count, in plain Python
+    """
+    wait = math.ceil(threshold - count)
+    wait -= count + wait - 1 >= threshold
+    wait += count + wait < threshold
+    return max(wait, 0)
+
+
 def calculateMonthlyInterestRate(rate):
     """
     Calculates monthly interest rate from yearly interest rate
@@ -311,17 +887,26 @@ def calculateMonthlyInterestRate(rate):
     return (10 ** (math.log10(1 + (rate / 100)) / 12)) - 1
 
 
+@functools.lru_cache(maxsize=4096)
+def amortizationFactor(monthlyRate, period):
+    """
+    Numerator and denominator of the amortization factor for a monthly rate and period in years
+    Cached since every scenario prices its mortgages at the same few (rate, period) pairs
+    """
+    compound = (1 + monthlyRate) ** (period * 12)
+    return monthlyRate * compound, compound - 1
+
+
 def monthlyMortgageCostForProperty(cost, down, monthlyRate, period):
     """
     Calculates the monthly mortgage payment for a property
     """
-    return (cost * 1000 * (1 - down / 100)) * \
-           (monthlyRate * ((1 + monthlyRate) ** (period * 12))) / \
-           (((1 + monthlyRate) ** (period * 12)) - 1)
+    numerator, denominator = amortizationFactor(monthlyRate, period)
+    return (cost * 1000 * (1 - down / 100)) * numerator / denominator
 
 
 def runOnce(mainSet):
-    data = Data(mainSet)
+    data = Data(mainSet, TextSink())
     data.setMonthlyRates()
     while True:
         if data.month > data.months:
@@ -333,71 +918,293 @@ def runOnce(mainSet):
         data.month += 1
 
 
-def getCashFlow(set):
-    data = Data(set)
+def simulate(set, checkTotals=False, events=None, profiler=None, schedule=None):
+    """
+    Runs the simulation once, filling a preallocated structured array with one row per month
+    Fields are SERIES_COLUMNS, the last row holds the final results
+    checkTotals verifies Data's running totals against a full recompute every month
+    events is an optional sink from events.py, by default nothing is reported
+    profiler is an optional profiling.PhaseProfiler to add this run's phase timings and counts to
+    schedule is an optional schedules.RateSchedule for the rates to follow month by month
+    """
+    data = Data(set, events, schedule)
+    data.checkTotals = checkTotals
+    data.profiler = profiler
+    if profiler is not None:
+        profiler.scenarios += 1
     data.setMonthlyRates()
-    while True:
-        if data.month > data.months:
-            return data.results()[1]
+    series = np.zeros(data.months + 1, dtype=[(name, float) for name in SERIES_COLUMNS])
+    while data.month <= data.months:
         data.simulateMonth()
+        series[data.month] = data.metrics()
         data.month += 1
+    return series
 
 
-def getTotalAssets(set):
+def simulateBranches(set, month, branches, checkTotals=False):
+    """
+    Runs set up to month once, then continues from there once for every branch, each a {parameter: new value}
+    dict applied from month onwards (see Data.update), so K branches cost one prefix plus K suffixes
+    Returns a simulate style series for every branch, in order, each with the shared prefix months filled in
+    """
     data = Data(set)
+    data.checkTotals = checkTotals
     data.setMonthlyRates()
-    while True:
-        if data.month > data.months:
-            return data.results()[0]
+    prefix = np.zeros(data.months + 1, dtype=[(name, float) for name in SERIES_COLUMNS])
+    while data.month < month and data.month <= data.months:
         data.simulateMonth()
+        prefix[data.month] = data.metrics()
         data.month += 1
+    checkpoint = data.snapshot()
+    results = []
+    for changes in branches:
+        data.restore(checkpoint)
+        data.update(changes)
+        series = prefix.copy()
+        while data.month <= data.months:
+            data.simulateMonth()
+            series[data.month] = data.metrics()
+            data.month += 1
+        results.append(series)
+    return results
+
+
+def getResults(set, cache=None, skip=False):
+    """
+    Final (total assets, cash flow) from a single run
+    cache is an optional result_cache.ResultCache consulted before simulating
+    skip jumps over the months nothing happens in (see Data.runSkipping) instead of recording every month
+    """
+    if cache is not None:
+        return cache.getOrCompute(set, lambda set: getResults(set, skip=skip))
+    if skip:
+        data = Data(set)
+        data.setMonthlyRates()
+        data.runSkipping()
+        totalAssets, cashFlow = data.results()
+        return float(totalAssets), float(cashFlow)
+    final = simulate(set)[-1]
+    return float(final["totalAssets"]), float(final["cashFlow"])
+
+
+def getCashFlow(set, cache=None):
+    return getResults(set, cache)[1]
+
+
+def getTotalAssets(set, cache=None):
+    return getResults(set, cache)[0]
+
+
+def plotSeries(series, columns=("totalAssets", "cashFlow")):
+    """
+    Plots the month by month values of the given SERIES_COLUMNS from a simulate run
+    """
+    months = np.arange(len(series))
+    for column in columns:
+        plt.plot(months, series[column])
+    plt.legend(columns)
+    plt.xlabel("month")
+    plt.show()
+
+
+def evaluateChunk(sets, batch=False, peakDTI=False):
+    """
+    Returns the (total assets, cash flow) results of every set in the chunk, in order
+    peakDTI adds the highest DTI reached in any month to each result
+    """
+    if batch:
+        from real_estate_batch import simulateBatch
+        if peakDTI:
+            results, series = simulateBatch(sets, record=True)
+            return [(assets, cashFlow, peak) for (assets, cashFlow), peak
+                    in zip(results.tolist(), series["DTI"].max(axis=1).tolist())]
+        return [tuple(results) for results in simulateBatch(sets).tolist()]
+    if peakDTI:
+        return [seriesResults(simulate(tmpSet), peakDTI) for tmpSet in sets]
+    return [getResults(tmpSet) for tmpSet in sets]
+
+
+def seriesResults(series, peakDTI=False):
+    final = series[-1]
+    results = (float(final["totalAssets"]), float(final["cashFlow"]))
+    return results + (float(series["DTI"].max()),) if peakDTI else results
 
 
-def getBenchMark(additions, growth, period):
-    total = additions
-    for _ in range(period):
-        total = total * (1 + calculateMonthlyInterestRate(growth))
-        total += additions
-    return total
+def profileChunk(sets, peakDTI=False):
+    """
+    evaluateChunk with the scalar engine, also returning a PhaseProfiler covering every set
+    """
+    profiler = PhaseProfiler()
+    results = [seriesResults(simulate(tmpSet, profiler=profiler), peakDTI) for tmpSet in sets]
+    return results, profiler
+
+
+def evaluateSets(sets, batch=False, workers=1, chunksize=None, cache=None, profiler=None, peakDTI=False):
+    """
+    Evaluates every set, returning the (total assets, cash flow) results in the same order as sets
+    peakDTI adds the highest DTI reached in any month to each result
+    With more than one worker the sets are split into chunks and spread over a process pool
+    workers=None uses every core, chunksize defaults to about four chunks per worker
+    With a ResultCache only the sets it hasn't seen are simulated, each distinct set once
+    With a PhaseProfiler every scalar run, in any process, is profiled into it (the batch engine isn't profiled)
+    """
+    if cache is not None:
+        keys = [cache.key({"params": tmpSet, "score": "peakDTI"} if peakDTI else tmpSet) for tmpSet in sets]
+        found = {}
+        for key in keys:
+            if key not in found:
+                found[key] = cache.get(key)
+        missing = {key: tmpSet for key, tmpSet in zip(keys, sets) if found[key] is None}
+        for key, results in zip(missing, evaluateSets(list(missing.values()), batch, workers, chunksize,
+                                                      profiler=profiler, peakDTI=peakDTI)):
+            cache.put(key, results)
+            found[key] = results
+        return [found[key] for key in keys]
+    profile = profiler is not None and not batch
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(sets) <= 1:
+        if profile:
+            results, chunkProfiler = profileChunk(sets, peakDTI)
+            profiler.merge(chunkProfiler)
+            return results
+        return evaluateChunk(sets, batch, peakDTI)
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(sets) / (workers * 4)))
+    chunks = [sets[i:i + chunksize] for i in range(0, len(sets), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if profile:
+            outputs = list(pool.map(profileChunk, chunks, [peakDTI] * len(chunks)))
+            for _, chunkProfiler in outputs:
+                profiler.merge(chunkProfiler)
+            return [value for results, _ in outputs for value in results]
+        results = pool.map(evaluateChunk, chunks, [batch] * len(chunks), [peakDTI] * len(chunks))
+        return [value for chunk in results for value in chunk]
+
+
+def drawJitter(mainSet, volatility, generator):
+    """
+    Random factor for each mainSet value, from 1 - volatility% to 1 + volatility% in whole percents
+    Returns the factors along with their antithetic mirror image around 1
+    """
+    draws = {trial: generator.randint(0, 2*volatility) for trial in mainSet}
+    jitter = {trial: 1.0 - volatility/100 + draws[trial]/100 for trial in mainSet}
+    mirror = {trial: 1.0 - volatility/100 + (2*volatility - draws[trial])/100 for trial in mainSet}
+    return jitter, mirror
+
+
+def sweepSet(mainSet, key, i, jitter):
+    """
+    A single point of a sweep
+    Every mainSet value is scaled by its jitter factor, then the variables in key are set to i times their mean
+    (or 1/i times when their sign is 0)
+    """
+    tmpSet = {trial: mainSet[trial] * jitter[trial] for trial in mainSet}
+    for _key in key:
+        tmpSet[_key[0]] = mainSet[_key[0]] * (i if _key[1] else 1/i)
+    return tmpSet
+
+
+def sweepSets(mainSet, variables, volatility, xpoints, trials, seed=None):
+    """
+    Every scenario of a plain runSimulation sweep: for each variable, trials jittered copies of each x point
+    seed makes the jitter reproducible, each scenario drawing from its own generator
+    """
+    sets = []
+    for k, key in enumerate(variables):
+        for j in range(trials):
+            for x, i in enumerate(xpoints):
+                generator = random if seed is None else random.Random("{}:{}:{}:{}".format(seed, k, j, x))
+                sets.append(sweepSet(mainSet, key, i, drawJitter(mainSet, volatility, generator)[0]))
+    return sets
+
+
+def varianceReducedSweep(mainSet, variables, cashFlow, volatility, xpoints, seed, targetError, maxTrials,
+                         batch=False, workers=1, chunksize=None, cache=None, profiler=None):
+    """
+    Averages each variable's curve over antithetic pairs of trials using common random numbers:
+    trial pair j applies the same jitter (and its mirror image) to every x point of every variable,
+    so the noise moves all curves together instead of making them jagged.
+    Pairs are added to a variable until the standard error of its curve, at its worst x point and as a fraction
+    of the curve's average magnitude, is at most targetError, or it has used maxTrials trials
+    At least 3 pairs are run so the standard error estimate itself is meaningful, unless maxTrials stops it sooner,
+    and at least one pair is always run, so an odd maxTrials is rounded down to whole pairs (but never below 2)
+    Returns the curves, the standard error each reached (nan with fewer than 3 pairs) and the number of trials each used
+    """
+    column = 1 if cashFlow else 0
+    pairMeans = [[] for _ in variables]
+    curves = [None for _ in variables]
+    errors = [math.nan for _ in variables]
+    active = list(range(len(variables)))
+    pair = 0
+    while active and (pair == 0 or 2 * (pair + 1) <= maxTrials):
+        jitter, mirror = drawJitter(mainSet, volatility, random.Random("{}:{}".format(seed, pair)))
+        sets = [sweepSet(mainSet, variables[k], i, trialJitter)
+                for k in active for trialJitter in (jitter, mirror) for i in xpoints]
+        values = np.array(evaluateSets(sets, batch, workers, chunksize, cache, profiler))[:, column]
+        values = values.reshape(len(active), 2, len(xpoints)).mean(axis=1)
+        for k, means in zip(list(active), values):
+            pairMeans[k].append(means)
+            curves[k] = np.mean(pairMeans[k], axis=0)
+            if len(pairMeans[k]) < 3:
+                continue
+            standardError = np.std(pairMeans[k], axis=0, ddof=1) / math.sqrt(len(pairMeans[k]))
+            errors[k] = standardError.max() / max(np.abs(curves[k]).mean(), 1e-12)
+            if errors[k] <= targetError:
+                active.remove(k)
+        pair += 1
+    return curves, errors, [2 * len(means) for means in pairMeans]
 
 
-def runSimulation(mainSet, variables, cashFlow, volatility, showBenchmark):
+def runSimulation(mainSet, variables, cashFlow, volatility, showBenchmark, batch=False, workers=1, chunksize=None,
+                  seed=None, cache=None, varianceReduction=False, targetError=0.01, maxTrials=40, profile=False):
     """
     Runs a simulation using the mean values in mainSet, 
     showing the effect of changing each variable down to 50% it's value up to 200% percent it's value.
     Adds/subtracts a random percent amount to each variable up to a max of volatility.
     cashflow is a boolean to determine whether to use cashflow on the y-axis or total assets
-    showBenchmark is a boolean to determine whether to show line on graph representing the scenario
-    of just investing money in market instead of real estate
+    showBenchmark is a boolean to determine whether to show dashed curves for the baseline strategies in baselines.py
+    (index fund, savings account, mortgage prepayment) over the same months, one per variable that moves them
+    batch is a boolean to determine whether to run every scenario at once with the vectorized batch engine
+    workers is the number of processes to spread the scenarios over (None for every core),
+    submitted in chunks of chunksize scenarios
+    seed makes the random amounts reproducible, each scenario drawing from its own generator
+    so the results don't depend on the order or process they are run in
+    cache is an optional result_cache.ResultCache so repeated scenarios are only simulated once
+    varianceReduction replaces the 5 independent trials with seeded antithetic pairs of common random numbers,
+    adding pairs until each curve's relative standard error is at most targetError (see varianceReducedSweep)
+    and reporting it in the legend
+    profile times each phase of every scalar scenario and prints the totals once the sweep is done
+    (see profiling.py)
     """
     xpoints = np.array([m / 100 for m in range(50, 200, 5)])
-    for key in variables:
-        yPointsHolder = []
-        for j in range(1 if volatility == 0 else 5):
-            yPoints = []
-            tmpSet = {}
-            for i in xpoints:
-                for trial in mainSet:
-                    tmpSet[trial] = mainSet[trial] * (1.0 - volatility/100 + random.randint(0, 2*volatility)/100)
-                for _key in key:
-                    tmpSet[_key[0]] = mainSet[_key[0]] * (i if _key[1] else 1/i)
-                yPoints.append(getCashFlow(tmpSet) if cashFlow else getTotalAssets(tmpSet))
-            yPointsHolder.append(yPoints)
-        yPoints = []
-        for i in range(len(xpoints)):
-            total = 0
-            for array in yPointsHolder:
-                total += array[i]
-            total = total / len(yPointsHolder)
-            yPoints.append(total)
-        ypoints = np.array(yPoints)
+    labels = list(variables)
+    profiler = PhaseProfiler() if profile else None
+    if varianceReduction and volatility != 0:
+        curves, errors, trials = varianceReducedSweep(mainSet, variables, cashFlow, volatility, xpoints,
+                                                      0 if seed is None else seed, targetError, maxTrials,
+                                                      batch, workers, chunksize, cache, profiler)
+        labels = ["{} (SE {:.2%}, {} trials)".format(key, error, n) for key, error, n in zip(variables, errors, trials)]
+    else:
+        trials = 1 if volatility == 0 else 5
+        sets = sweepSets(mainSet, variables, volatility, xpoints, trials, seed)
+        allPoints = np.array(evaluateSets(sets, batch, workers, chunksize, cache, profiler))[:, 1 if cashFlow else 0]
+        curves = np.reshape(allPoints, (len(variables), trials, len(xpoints))).mean(axis=1)
+    if profiler is not None:
+        profiler.printSummary()
+    for ypoints in curves:
         plt.plot(xpoints, ypoints)
     if showBenchmark:
-        benchMark = getBenchMark(mainSet["additions"], mainSet["growth"], 180)
-        benchMark = benchMark * calculateMonthlyInterestRate(mainSet["growth"]) if cashFlow else benchMark
-        plt.plot(xpoints, [benchMark for _ in xpoints])
-        variables.append("benchMark")
-    plt.legend(variables)
+        from baselines import sweepBaselines
+        for strategy, values in sweepBaselines(mainSet, variables, xpoints).items():
+            baselineCurves = values[:, :, 1 if cashFlow else 0]
+            flat = np.all(np.isclose(baselineCurves, baselineCurves[:, :1]), axis=1)
+            if flat.any():
+                plt.plot(xpoints, baselineCurves[np.flatnonzero(flat)[0]], linestyle="--")
+                labels.append(strategy)
+            for k in np.flatnonzero(~flat):
+                plt.plot(xpoints, baselineCurves[k], linestyle="--")
+                labels.append("{} {}".format(strategy, variables[k]))
+    plt.legend(labels)
     plt.ylim(bottom=0)
     plt.show()
 
@@ -446,7 +1253,14 @@ mainSet = {
 # runSimulation runs the data multiple times, 
 # using a range of 50% - 200% of the mean values in the main set, 
 # with random volatility added/subtracted from the variables, and then graphs the variables
+# plotSeries(simulate(mainSet)) graphs a single run month by month
 # Note that depending on the values set, this simulation can take a few minutes to run!
+# Passing batch=True to runSimulation runs every scenario at once with the vectorized engine in real_estate_batch.py
+# and workers=None spreads the scenarios over every core
+# Passing cache=ResultCache(directory="cache") from result_cache.py skips scenarios simulated in earlier runs
+# To simulate scenarios from a file without any prompts or plots, use runner.py
+# simulate(mainSet, schedule=RateSchedule.fromCsv("rates.csv")) from schedules.py follows historical rates month by month
 
-runOnce(mainSet)
-# runSimulation(mainSet, variables, True, 1, True)
+if __name__ == "__main__":
+    runOnce(mainSet)
+    # runSimulation(mainSet, variables, True, 1, True)
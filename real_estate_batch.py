@@ -0,0 +1,245 @@
+"""
+Vectorized batch engine for the real_estate simulation
+Advances many parameter sets month by month side by side with NumPy arrays,
+following the same rules as real_estate.Data so that every scenario ends with
+the same results() tuple as getTotalAssets/getCashFlow, to within float tolerance
+"""
+import numpy as np
+
+from real_estate import removalSkips
+
+# Keys read by Data, in the column order used when the sets are given as a 2D array
+KEYS = ("holdTime", "safety", "additions", "expenses", "income", "cost", "down", "amortization", "rent", "tax",
+        "management", "repairs", "insurance", "interest", "occupancy", "time", "maxDTI", "market", "growth")
+
+# Same horizon and mortgage term that Data uses
+MONTHS = 300
+TERM = 100
+
+
+def parameterColumns(sets):
+    """
+    Converts a list of mainSet style dicts, or a 2D array with one column per key in KEYS,
+    into a dict of 1D float arrays keyed by parameter name
+    """
+    if isinstance(sets, np.ndarray):
+        table = np.asarray(sets, dtype=float)
+    else:
+        table = np.array([[s[key] for key in KEYS] for s in sets], dtype=float)
+    table = table.reshape(-1, len(KEYS))
+    return {key: table[:, i] for i, key in enumerate(KEYS)}
+
+
+def monthlyRates(rates):
+    """
+    Vectorized calculateMonthlyInterestRate
+    """
+    return (10 ** (np.log10(1 + (rates / 100)) / 12)) - 1
+
+
+class Holdings:
+    """
+    Properties of every scenario stored as (scenarios x slots) arrays
+    Each scenario fills its row left to right in purchase order, so the slot order matches Data.properties
+    Empty slots have bought == inf and zero value, owing and mortgage
+    """
+    COLUMNS = ("value", "owing", "mortgage", "rate", "bought", "listedAt")
+
+    def __init__(self, scenarios, width=32):
+        self.value = np.zeros((scenarios, width))
+        self.owing = np.zeros((scenarios, width))
+        self.mortgage = np.zeros((scenarios, width))
+        self.rate = np.zeros((scenarios, width))
+        self.bought = np.full((scenarios, width), np.inf)
+        self.listedAt = np.full((scenarios, width), np.inf)
+        self.fill = np.zeros(scenarios, dtype=np.intp)
+
+    def makeRoom(self, rows):
+        """
+        Ensures every scenario in rows has a free slot at the end of its row
+        Compacts the live holdings to the left first and widens the arrays only if that is not enough
+        """
+        if self.fill[rows].max() < self.value.shape[1]:
+            return
+        order = np.argsort(self.bought, axis=1, kind="stable")
+        for name in self.COLUMNS:
+            setattr(self, name, np.take_along_axis(getattr(self, name), order, axis=1))
+        self.fill = np.count_nonzero(self.bought < np.inf, axis=1)
+        width = self.value.shape[1]
+        if self.fill.max() >= width:
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                empty = np.inf if name in ("bought", "listedAt") else 0.0
+                setattr(self, name, np.concatenate([column, np.full_like(column, empty)], axis=1))
+
+
+# Parameters that may follow a per month schedule instead of staying constant
+SCHEDULED = ("interest", "market", "growth", "rent", "occupancy")
+
+
+def simulateBatch(sets, months=MONTHS, schedules=None, record=False):
+    """
+    Simulates every parameter set for months + 1 months, like getCashFlow/getTotalAssets
+    sets is a list of mainSet style dicts or a 2D array with one column per key in KEYS
+    Returns an (N, 2) array holding the (total assets, cash flow) results() tuple of each scenario
+    Refinancing is not modelled since Data only refinances after its 100 year term
+
+    schedules optionally maps any of SCHEDULED to an (N, months + 1) array giving that parameter for each
+    scenario and month, replacing the constant in sets. A mortgage keeps the interest rate of the month it was
+    taken out, market growth, stock growth, rent and occupancy apply to everything owned in that month
+    A schedules.RateSchedule's annual dict can be passed as schedules to share one schedule between every scenario
+    With record=True the result is (results, series), series holding (N, months + 1) arrays of
+    "totalAssets", "cashFlow" and "DTI" at the end of each month
+    """
+    if months >= TERM * 12:
+        raise ValueError("simulateBatch does not model refinancing, months must be below {}".format(TERM * 12))
+    p = parameterColumns(sets)
+    scenarios = len(p["cost"])
+    table = {key: p[key][:, None] for key in SCHEDULED}
+    for key, schedule in (schedules or {}).items():
+        if key not in SCHEDULED:
+            raise ValueError("{} can't follow a schedule, only {} can".format(key, ", ".join(SCHEDULED)))
+        table[key] = np.broadcast_to(np.asarray(schedule, dtype=float), (scenarios, months + 1))
+
+    price = p["cost"] * 1000
+    fixedExpenses = p["tax"] / 12 + p["insurance"] / 12 + p["repairs"] / 12 + p["management"] / 12
+    monthlyIncome = p["income"] / 12
+    holdMonths = (p["holdTime"] * 12)[:, None]
+    listMonths = p["time"][:, None]
+
+    # Everything derived from a scheduled parameter is computed once for all months up front
+    unitRents = (table["occupancy"] / 100) * table["rent"]
+    addedIncomes = table["rent"] * table["occupancy"] / 100
+    interestRates = monthlyRates(table["interest"])
+    growthFactors = 1 + monthlyRates(table["growth"])
+    marketFactors = 1 + monthlyRates(table["market"])
+    compound = (1 + interestRates) ** (p["amortization"][:, None] * 12)
+    amortizationTops = interestRates * compound
+    amortizationBottoms = compound - 1
+
+    def atMonth(values, month):
+        return values[:, month if values.shape[1] > 1 else 0]
+
+    cash = np.zeros(scenarios)
+    emergencyFund = np.zeros(scenarios)
+    count = np.zeros(scenarios)
+    unlisted = np.zeros(scenarios)
+    mortgageTotal = np.zeros(scenarios)
+    book = Holdings(scenarios)
+    if record:
+        series = {name: np.empty((scenarios, months + 1)) for name in ("totalAssets", "cashFlow", "DTI")}
+
+    for month in range(months + 1):
+        unitRent = atMonth(unitRents, month)
+        addedIncome = atMonth(addedIncomes, month)
+        interestRate = atMonth(interestRates, month)
+        amortizationTop = atMonth(amortizationTops, month)
+        amortizationBottom = atMonth(amortizationBottoms, month)
+        growthFactor = atMonth(growthFactors, month)
+        marketFactor = atMonth(marketFactors, month)[:, None]
+
+        def mortgageFor(down):
+            return (price * (1 - down / 100)) * amortizationTop / amortizationBottom
+
+        def withinDTI(down, debt, income):
+            debt = debt + (fixedExpenses + mortgageFor(down))
+            income = income + addedIncome
+            safeIncome = np.where(income == 0, 1, income)
+            return np.where(income == 0, 0, (debt / safeIncome) * 100) <= p["maxDTI"]
+
+        def minimumDown(debt, income):
+            # Direct solve of the 1% step search in Data.minimumDown, then nudged onto the exact boundary
+            headroom = p["maxDTI"] * (income + addedIncome) / 100 - debt - fixedExpenses
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lowest = 100 * (1 - headroom * amortizationBottom / (price * amortizationTop))
+            # Number of 1% steps from down up to 100%, one past the last is "no down payment works"
+            limit = np.floor(100 - p["down"]) + 1
+            steps = np.clip(np.ceil(np.nan_to_num(lowest - p["down"], nan=0.0)), 0, limit)
+            # With no income the DTI is 0, so the first step always works
+            steps = np.where(income + addedIncome == 0, 0, steps)
+            while True:
+                up = (steps < limit) & ~withinDTI(p["down"] + steps, debt, income)
+                if not up.any():
+                    break
+                steps += up
+            while True:
+                back = (steps > 0) & withinDTI(p["down"] + steps - 1, debt, income)
+                if not back.any():
+                    break
+                steps -= back
+            down = p["down"] + steps
+            return down, mortgageFor(down), (steps < limit) & withinDTI(down, debt, income)
+
+        # 1. Sell
+        bought, listedAt = book.bought, book.listedAt
+        ready = (bought <= month - holdMonths) & (listedAt == np.inf)
+        candidates = ready | (listedAt <= month - listMonths)
+        rows = np.flatnonzero(candidates.any(axis=1))
+        if rows.size:
+            alive = bought[rows] < np.inf
+            listing = ready[rows]
+            act = (listing & (listMonths[rows] <= 0)) | (listedAt[rows] <= month - listMonths[rows])
+            skipped = removalSkips(alive, act)
+            sells = act & ~skipped
+            lists = listing & ~skipped
+            listedAt[rows] = np.where(lists, month, listedAt[rows])
+            value, owing, mortgage = book.value[rows], book.owing[rows], book.mortgage[rows]
+            cash[rows] += np.where(sells, value - owing, 0).sum(axis=1)
+            count[rows] -= sells.sum(axis=1)
+            unlisted[rows] -= lists.sum(axis=1)
+            mortgageTotal[rows] -= np.where(sells, mortgage, 0).sum(axis=1)
+            book.value[rows] = np.where(sells, 0, value)
+            book.owing[rows] = np.where(sells, 0, owing)
+            book.mortgage[rows] = np.where(sells, 0, mortgage)
+            bought[rows] = np.where(sells, np.inf, bought[rows])
+            listedAt[rows] = np.where(sells, np.inf, listedAt[rows])
+
+        # 2. Refinance never happens within the horizon
+        # 3. Buy
+        debt = count * fixedExpenses + mortgageTotal + p["expenses"]
+        income = count * unitRent + monthlyIncome
+        down, mortgage, possible = minimumDown(debt, income)
+        upfront = price * down / 100
+        reserve = (fixedExpenses + mortgage) * p["safety"]
+        buyers = np.flatnonzero(possible & (cash >= upfront + reserve))
+        if buyers.size:
+            book.makeRoom(buyers)
+            slots = book.fill[buyers]
+            book.value[buyers, slots] = price[buyers]
+            book.owing[buyers, slots] = price[buyers] * (1 - down[buyers] / 100)
+            book.mortgage[buyers, slots] = mortgage[buyers]
+            book.rate[buyers, slots] = interestRate[buyers]
+            book.bought[buyers, slots] = month
+            book.listedAt[buyers, slots] = np.inf
+            book.fill[buyers] += 1
+            cash[buyers] -= upfront[buyers] + reserve[buyers]
+            emergencyFund[buyers] += reserve[buyers]
+            count[buyers] += 1
+            unlisted[buyers] += 1
+            mortgageTotal[buyers] += mortgage[buyers]
+
+        # 4. Monthly accrual of every property
+        owing = book.owing
+        owing -= book.mortgage - owing * book.rate
+        np.maximum(owing, 0, out=owing)
+        book.value *= np.where(book.listedAt == np.inf, marketFactor, 1.0)
+
+        # 5. and 6. Cash and emergency fund
+        cash += p["additions"]
+        cash -= count * fixedExpenses + mortgageTotal
+        cash += unitRent * unlisted
+        cash *= growthFactor
+        emergencyFund *= growthFactor
+
+        if record:
+            series["totalAssets"][:, month] = cash + (book.value - book.owing).sum(axis=1) + emergencyFund
+            series["cashFlow"][:, month] = count * unitRent - (count * fixedExpenses + mortgageTotal)
+            debt = count * fixedExpenses + mortgageTotal + p["expenses"]
+            income = count * unitRent + monthlyIncome
+            series["DTI"][:, month] = np.where(income == 0, 0, debt / np.where(income == 0, 1, income) * 100)
+
+    equity = (book.value - book.owing).sum(axis=1)
+    totalAssets = cash + equity + emergencyFund
+    cashFlow = count * unitRent - (count * fixedExpenses + mortgageTotal)
+    results = np.column_stack([totalAssets, cashFlow])
+    return (results, series) if record else results
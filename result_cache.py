@@ -0,0 +1,164 @@
+"""
+Content addressed cache for simulation results
+Entries are keyed on a hash of the canonical form of a parameter set and kept in an in-memory LRU,
+optionally backed by a size bounded directory on disk shared between runs and processes
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+def canonicalValue(value):
+    """
+    Converts a parameter value into a JSON friendly form that is equal for equal values
+    Numbers all become floats so 25 and 25.0 share an entry, arrays are reduced to a hash of their contents
+    """
+    if isinstance(value, dict):
+        return {str(k): canonicalValue(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonicalValue(v) for v in value]
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        return {"array": hashlib.sha256(array.tobytes()).hexdigest(), "dtype": str(array.dtype),
+                "shape": list(array.shape)}
+    if isinstance(value, (bool, np.bool_)) or value is None or isinstance(value, str):
+        return value
+    return float(value)
+
+
+def canonicalKey(params, namespace=""):
+    """
+    Hex digest identifying the parameter set, independent of key order and number types
+    """
+    canonical = json.dumps([namespace, canonicalValue(params)], sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Two tier result cache
+    maxEntries bounds the in-memory LRU tier
+    directory enables the on-disk tier, which evicts its least recently used files once it grows past maxBytes
+    namespace is mixed into every key, change it when the simulator's results change to orphan old entries
+    """
+    def __init__(self, maxEntries=4096, directory=None, maxBytes=256 * 1024 * 1024, namespace=""):
+        self.maxEntries = maxEntries
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.namespace = namespace
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.diskBytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.diskBytes = sum(size for _, size, _ in self.diskEntries())
+
+    def key(self, params):
+        return canonicalKey(params, self.namespace)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """
+        Returns the cached value or None, counting the lookup as a hit or a miss
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.directory is not None:
+            path = self.path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self.remember(key, value)
+                self.hits += 1
+                self.diskHits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.remember(key, value)
+        if self.directory is not None:
+            handle, tmpPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            path = self.path(key)
+            if os.path.exists(path):
+                self.diskBytes -= os.path.getsize(path)
+            os.replace(tmpPath, path)
+            self.diskBytes += os.path.getsize(path)
+            if self.diskBytes > self.maxBytes:
+                self.evict()
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxEntries:
+            self.memory.popitem(last=False)
+
+    def diskEntries(self):
+        """
+        (last used, size, path) of every file in the disk tier
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used disk entries until the directory is below 90% of maxBytes,
+        leaving headroom so a full cache isn't rescanned on every put
+        Other processes may share the directory, so the size is recounted from the files themselves
+        """
+        entries = sorted(self.diskEntries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= 0.9 * self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.diskBytes = total
+
+    def getOrCompute(self, params, compute):
+        """
+        Returns the cached value for params, calling compute(params) and storing the result on a miss
+        """
+        key = self.key(params)
+        value = self.get(key)
+        if value is None:
+            value = compute(params)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
+            self.diskBytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "diskHits": self.diskHits, "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0, "entries": len(self.memory)}
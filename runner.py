@@ -0,0 +1,184 @@
+"""
+Non-interactive batch runner for the real_estate simulator
+Reads scenarios from a JSONL or CSV file, simulates them over a worker pool and streams the results to CSV
+
+    python runner.py scenarios.jsonl -o results.csv --workers 4
+    python runner.py scenarios.csv -o results.csv --series series.csv --resume
+
+Each scenario is a set of mainSet keys, any key it leaves out taking its mainSet value
+An "id" field, if present, is copied to the output, otherwise scenarios are numbered from 0 in input order
+Results are written in input order as soon as each chunk and every chunk before it has finished,
+with at most a few chunks per worker in flight, so memory doesn't grow with the size of the input
+--resume keeps the rows already written (dropping a half written last line) and carries on after them
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from real_estate import SERIES_COLUMNS, Data, mainSet, simulate
+
+RESULT_FIELDS = ("id", "totalAssets", "cashFlow")
+# Series the batch engine records, the scalar engine records all of SERIES_COLUMNS
+BATCH_SERIES = ("totalAssets", "cashFlow", "DTI")
+
+
+def readScenarios(path):
+    """
+    Yields (id, parameter set) for every scenario in a .jsonl or .csv file, one at a time
+    """
+    with open(path, newline="") as file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for i, row in enumerate(rows):
+            scenario = dict(row)
+            scenarioId = scenario.pop("id", i)
+            tmpSet = dict(mainSet)
+            tmpSet.update((key, float(value)) for key, value in scenario.items())
+            yield scenarioId, tmpSet
+
+
+def runChunk(chunk, batch=False, seriesColumns=()):
+    """
+    Simulates a list of (id, parameter set), returning (result rows, series rows)
+    Series rows are id, column name and the column's value for every month
+    """
+    if batch:
+        from real_estate_batch import simulateBatch
+        output = simulateBatch([tmpSet for _, tmpSet in chunk], record=bool(seriesColumns))
+        results, series = output if seriesColumns else (output, None)
+        resultRows = [(scenarioId, assets, cashFlow) for (scenarioId, _), (assets, cashFlow)
+                      in zip(chunk, results.tolist())]
+        seriesRows = [[scenarioId, column] + series[column][i].tolist()
+                      for i, (scenarioId, _) in enumerate(chunk) for column in seriesColumns]
+        return resultRows, seriesRows
+    resultRows, seriesRows = [], []
+    for scenarioId, tmpSet in chunk:
+        series = simulate(tmpSet)
+        resultRows.append((scenarioId, float(series["totalAssets"][-1]), float(series["cashFlow"][-1])))
+        seriesRows.extend([scenarioId, column] + series[column].tolist() for column in seriesColumns)
+    return resultRows, seriesRows
+
+
+def completeLines(path, limit=None):
+    """
+    Counts the complete lines of a file, cutting it back to the first limit of them
+    and dropping anything after the last newline
+    """
+    count, offset = 0, 0
+    with open(path, "rb+") as file:
+        for line in file:
+            if not line.endswith(b"\n") or (limit is not None and count == limit):
+                break
+            count += 1
+            offset += len(line)
+        file.truncate(offset)
+    return count
+
+
+def resumePoint(output, seriesOutput, seriesColumns):
+    """
+    Number of scenarios already written to output (and seriesOutput), trimming both back to that many
+    """
+    if not os.path.exists(output):
+        return 0
+    done = max(completeLines(output) - 1, 0)
+    if seriesOutput is not None:
+        written = (max(completeLines(seriesOutput) - 1, 0) if os.path.exists(seriesOutput) else 0) // \
+            len(seriesColumns)
+        done = min(done, written)
+        if os.path.exists(seriesOutput):
+            completeLines(seriesOutput, done * len(seriesColumns) + 1 if done else 0)
+    completeLines(output, done + 1 if done else 0)
+    return done
+
+
+def runScenarios(path, output, seriesOutput=None, seriesColumns=("totalAssets", "cashFlow"), batch=False,
+                 workers=1, chunksize=64, resume=False, verbose=True):
+    """
+    Simulates every scenario in path, writing (id, totalAssets, cashFlow) rows to the CSV output
+    and, with seriesOutput, one row of monthly values per scenario and series column to that CSV
+    workers=None uses every core, resume continues after the scenarios a previous run already wrote
+    Returns the number of scenarios simulated
+    """
+    seriesColumns = tuple(seriesColumns) if seriesOutput is not None else ()
+    allowed = BATCH_SERIES if batch else SERIES_COLUMNS
+    for column in seriesColumns:
+        if column not in allowed:
+            raise ValueError("Unknown series column {}, choose from {}".format(column, ", ".join(allowed)))
+    workers = os.cpu_count() if workers is None else workers
+    done = resumePoint(output, seriesOutput, seriesColumns) if resume else 0
+    scenarios = itertools.islice(readScenarios(path), done, None)
+    chunks = iter(lambda: list(itertools.islice(scenarios, chunksize)), [])
+
+    mode = "a" if done else "w"
+    resultFile = open(output, mode, newline="")
+    seriesFile = open(seriesOutput, mode, newline="") if seriesColumns else None
+    results = csv.writer(resultFile)
+    series = csv.writer(seriesFile) if seriesFile is not None else None
+    if not done:
+        results.writerow(RESULT_FIELDS)
+        if series is not None:
+            series.writerow(["id", "column"] + ["month{}".format(m) for m in range(Data(mainSet).months + 1)])
+    simulated = 0
+
+    def write(chunkRows):
+        resultRows, seriesRows = chunkRows
+        # Series first, so a results row always has its series behind it
+        if series is not None:
+            series.writerows(seriesRows)
+            seriesFile.flush()
+        results.writerows(resultRows)
+        resultFile.flush()
+        return len(resultRows)
+
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                simulated += write(runChunk(chunk, batch, seriesColumns))
+                if verbose:
+                    print("{} scenarios done".format(done + simulated), file=sys.stderr)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in itertools.chain(chunks, [None]):
+                    if chunk is not None:
+                        pending.append(pool.submit(runChunk, chunk, batch, seriesColumns))
+                    # Keep a few chunks per worker in flight, writing the oldest as soon as it's ready
+                    while pending and (chunk is None or len(pending) >= 2 * workers):
+                        simulated += write(pending.popleft().result())
+                        if verbose:
+                            print("{} scenarios done".format(done + simulated), file=sys.stderr)
+    finally:
+        resultFile.close()
+        if seriesFile is not None:
+            seriesFile.close()
+    return simulated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many real_estate scenarios from a JSONL or CSV file")
+    parser.add_argument("scenarios", help=".jsonl file of JSON objects or .csv file with a header row")
+    parser.add_argument("-o", "--output", required=True, help="CSV file for the final results")
+    parser.add_argument("--series", help="CSV file for the monthly series of each scenario")
+    parser.add_argument("--series-columns", default="totalAssets,cashFlow",
+                        help="comma separated series to write (default totalAssets,cashFlow)")
+    parser.add_argument("--batch", action="store_true", help="use the vectorized batch engine")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for every core")
+    parser.add_argument("--chunksize", type=int, default=64, help="scenarios per chunk of work")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run into the same files")
+    parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    args = parser.parse_args(argv)
+    runScenarios(args.scenarios, args.output, args.series, args.series_columns.split(","), args.batch,
+                 args.workers or None, args.chunksize, args.resume, not args.quiet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Month by month rate schedules for the real_estate simulator
+A RateSchedule holds interest, market growth, stock growth, rent and occupancy for every month of a run,
+given as arrays or read from a CSV of historical values, in the same units as the mainSet values they replace
+Monthly rates, compounding factors and their cumulative products are worked out once when it's made,
+so a run only looks values up, and the arrays are read only so any number of runs can share one schedule
+Data(set, schedule=...) follows it month by month, simulateBatch(sets, schedules=schedule.annual) does the same
+"""
+import csv
+
+import numpy as np
+
+from real_estate_batch import MONTHS, SCHEDULED, monthlyRates
+
+# Scheduled annual rates, in percent, and the Data attribute holding each one's monthly rate
+RATES = {"interest": "monthlyInterestRate", "market": "monthlyMarketRate", "growth": "monthlyGrowthRate"}
+
+
+def readOnly(values):
+    values.flags.writeable = False
+    return values
+
+
+class RateSchedule:
+    """
+    Values for months 0 to months of any of SCHEDULED, each given as a sequence with one value per month
+    A sequence shorter than the run holds its last value to the end, a longer one is cut off
+    For the rates it also keeps
+        monthly[key]    the monthly rate in each month
+        factors[key]    1 + the monthly rate
+        cumulative[key] the product of the factors of every month before, so cumulative[key][b] / cumulative[key][a]
+                        is the growth from the start of month a to the start of month b
+    """
+
+    def __init__(self, months=MONTHS, **series):
+        self.months = months
+        self.annual = {}
+        for key, values in series.items():
+            if key not in SCHEDULED:
+                raise ValueError("{} can't follow a schedule, only {} can".format(key, ", ".join(SCHEDULED)))
+            values = np.asarray(values, dtype=float).ravel()
+            if not values.size:
+                raise ValueError("The {} schedule is empty".format(key))
+            padded = np.empty(months + 1)
+            given = min(values.size, months + 1)
+            padded[:given] = values[:given]
+            padded[given:] = values[given - 1]
+            self.annual[key] = readOnly(padded)
+        self.monthly = {key: readOnly(monthlyRates(self.annual[key])) for key in RATES if key in self.annual}
+        self.factors = {key: readOnly(1 + rates) for key, rates in self.monthly.items()}
+        self.cumulative = {key: readOnly(np.concatenate([[1.0], np.cumprod(factors)]))
+                           for key, factors in self.factors.items()}
+        # Data attribute name -> value in each month, as plain floats so Data's arithmetic stays in floats
+        self.attributes = {key: self.annual[key].tolist() for key in self.annual}
+        self.attributes.update({RATES[key]: rates.tolist() for key, rates in self.monthly.items()})
+
+    def __contains__(self, key):
+        return key in self.annual
+
+    def growth(self, key, start, end):
+        """
+        Compounded growth of a scheduled rate from the start of month start to the start of month end
+        """
+        return self.cumulative[key][end] / self.cumulative[key][start]
+
+    @classmethod
+    def fromCsv(cls, path, months=MONTHS, columns=None):
+        """
+        Reads a schedule from a CSV file with a header row and one row per month, oldest first
+        columns maps scheduled keys to the CSV column holding them, by default every column named after one
+        of SCHEDULED is used and anything else (a date column, say) is ignored
+        """
+        with open(path, newline="") as file:
+            rows = list(csv.DictReader(file))
+        if not rows:
+            raise ValueError("{} has no rows".format(path))
+        if columns is None:
+            columns = {key: key for key in SCHEDULED if key in rows[0]}
+        missing = [column for column in columns.values() if column not in rows[0]]
+        if missing:
+            raise ValueError("{} has no column {}".format(path, ", ".join(missing)))
+        return cls(months, **{key: [float(row[column]) for row in rows] for key, column in columns.items()})
@@ -0,0 +1,134 @@
+"""
+Global sensitivity analysis for the real_estate model
+Where runSimulation moves one variable at a time from 50% to 200% of its mainSet value,
+these methods move every variable at once over the same range, so the answer includes interactions
+Morris screening ranks the variables cheaply, Sobol indices split the variance of the result between them
+All the scenarios of a method are generated up front and evaluated together with the batch engine
+"""
+import numpy as np
+
+from real_estate import evaluateSets, mainSet
+from real_estate_batch import KEYS
+
+# Range each variable is moved over, as a fraction of its mainSet value
+LOW = 0.5
+HIGH = 2.0
+
+
+def unitToSets(unit, mainSet, keys):
+    """
+    Maps rows of points in the unit cube to parameter sets, column j moving keys[j] linearly from LOW to HIGH
+    times its mainSet value, everything else staying at its mainSet value
+    """
+    sets = []
+    for row in unit:
+        tmpSet = dict(mainSet)
+        for key, u in zip(keys, row):
+            tmpSet[key] = mainSet[key] * (LOW + u * (HIGH - LOW))
+        sets.append(tmpSet)
+    return sets
+
+
+def evaluateUnit(unit, mainSet, keys, cashFlow, workers=1, cache=None):
+    """
+    Cash flow or total assets for every row of unit
+    """
+    results = evaluateSets(unitToSets(unit, mainSet, keys), batch=True, workers=workers, cache=cache)
+    return np.array(results)[:, 1 if cashFlow else 0]
+
+
+def sobolIndices(mainSet=mainSet, keys=KEYS, cashFlow=True, samples=256, seed=0, bootstrap=100, workers=1,
+                 cache=None):
+    """
+    First order and total Sobol indices of every key, using Saltelli sampling
+    Two random sample matrices A and B are evaluated once and shared by every key,
+    each key adding only the matrix AB_i (A with column i taken from B), so the whole analysis costs
+    samples * (len(keys) + 2) simulations
+    First order indices use the Saltelli (2010) estimator, total indices the Jansen estimator
+    Returns {key: (first order, total, first order confidence, total confidence)},
+    the confidences being the standard deviation of each index over bootstrap resamples
+    """
+    rng = np.random.default_rng(seed)
+    k = len(keys)
+    a = rng.random((samples, k))
+    b = rng.random((samples, k))
+    mixed = np.repeat(a[None], k, axis=0)
+    for i in range(k):
+        mixed[i, :, i] = b[:, i]
+    values = evaluateUnit(np.concatenate([a, b, mixed.reshape(-1, k)]), mainSet, keys, cashFlow, workers, cache)
+    fA, fB, fAB = values[:samples], values[samples:2 * samples], values[2 * samples:].reshape(k, samples)
+
+    def estimate(rows):
+        variance = np.var(np.concatenate([fA[rows], fB[rows]]))
+        if variance == 0:
+            return np.zeros(k), np.zeros(k)
+        first = np.mean(fB[rows] * (fAB[:, rows] - fA[rows]), axis=1) / variance
+        total = 0.5 * np.mean((fA[rows] - fAB[:, rows]) ** 2, axis=1) / variance
+        return first, total
+
+    first, total = estimate(np.arange(samples))
+    resampled = [estimate(rng.integers(0, samples, samples)) for _ in range(bootstrap)]
+    firstSpread = np.std([r[0] for r in resampled], axis=0) if bootstrap else np.zeros(k)
+    totalSpread = np.std([r[1] for r in resampled], axis=0) if bootstrap else np.zeros(k)
+    return {key: (first[i], total[i], firstSpread[i], totalSpread[i]) for i, key in enumerate(keys)}
+
+
+def morrisTrajectories(rng, trajectories, k, levels):
+    """
+    Morris one-at-a-time trajectories on a grid of levels per axis
+    Each trajectory starts at a random grid point and moves every coordinate once, in random order,
+    by delta = levels / (2 * (levels - 1)), stepping down instead of up when up would leave the cube
+    Returns (trajectories, k + 1, k) points and the (trajectories, k) order the coordinates were moved in
+    """
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    points = np.empty((trajectories, k + 1, k))
+    orders = np.empty((trajectories, k), dtype=int)
+    for t in range(trajectories):
+        point = rng.choice(grid, size=k)
+        points[t, 0] = point
+        orders[t] = rng.permutation(k)
+        for step, i in enumerate(orders[t]):
+            point = point.copy()
+            point[i] += delta if point[i] + delta <= 1 else -delta
+            points[t, step + 1] = point
+    return points, orders
+
+
+def morrisEffects(mainSet=mainSet, keys=KEYS, cashFlow=True, trajectories=20, levels=4, seed=0, workers=1,
+                  cache=None):
+    """
+    Morris elementary effects screening, costing trajectories * (len(keys) + 1) simulations
+    Returns {key: (mu*, mu, sigma)}: the mean absolute, mean and standard deviation of the key's elementary
+    effects, in result units per unit of the LOW to HIGH range. A large sigma relative to mu* points to
+    interactions or non-linearity
+    """
+    rng = np.random.default_rng(seed)
+    k = len(keys)
+    points, orders = morrisTrajectories(rng, trajectories, k, levels)
+    values = evaluateUnit(points.reshape(-1, k), mainSet, keys, cashFlow, workers, cache).reshape(trajectories, k + 1)
+    effects = np.empty((trajectories, k))
+    for t in range(trajectories):
+        for step, i in enumerate(orders[t]):
+            moved = points[t, step + 1, i] - points[t, step, i]
+            effects[t, i] = (values[t, step + 1] - values[t, step]) / moved
+    return {key: (np.abs(effects[:, i]).mean(), effects[:, i].mean(), effects[:, i].std(ddof=1) if trajectories > 1
+                  else 0.0) for i, key in enumerate(keys)}
+
+
+def printSobol(indices):
+    print("{:<14}{:>12}{:>12}".format("variable", "first", "total"))
+    for key, (first, total, firstSpread, totalSpread) in sorted(indices.items(), key=lambda item: -item[1][1]):
+        print("{:<14}{:>7.3f}±{:<4.2f}{:>7.3f}±{:<4.2f}".format(key, first, firstSpread, total, totalSpread))
+
+
+def printMorris(effects):
+    print("{:<14}{:>14}{:>14}{:>14}".format("variable", "mu*", "mu", "sigma"))
+    for key, (absolute, mean, sigma) in sorted(effects.items(), key=lambda item: -item[1][0]):
+        print("{:<14}{:>14.1f}{:>14.1f}{:>14.1f}".format(key, absolute, mean, sigma))
+
+
+if __name__ == "__main__":
+    printMorris(morrisEffects(mainSet, cashFlow=True))
+    print()
+    printSobol(sobolIndices(mainSet, cashFlow=True))
@@ -0,0 +1,118 @@
+"""
+Checks of the btc_pattern backtest and its reporting
+Run with python -m pytest test_backtest.py
+"""
+import numpy as np
+import pytest
+
+from backtest import START, backtest, initialState, signals, streamBacktest
+from backtest_report import Summary
+
+
+def loopBacktest(prices, volumes):
+    """
+    The original btc_pattern loop, a minute at a time with the default strategy
+    Returns (trades, trial, trialAdded, maxAdded, benchmarkAdjusted), one row per minute from minute 20
+    """
+    prices, volumes = prices.tolist(), volumes.tolist()
+    benchmark = trial = START
+    trialAdded = maxAdded = 0.0
+    rows = []
+    for i in range(20, len(prices)):
+        multiplier = prices[i] / prices[max(i - 1, 20)]
+        benchmark = benchmark * multiplier
+        trial = trial * multiplier
+        angle = (sum(prices[i - 10:i]) / 10) / (sum(prices[i - 20:i - 10]) / 10)
+        trade = 0.0
+        if volumes[i] > sum(volumes[i - 20:i]) / 20 * 3:
+            if angle > 1.01:
+                trade = 100.0
+            if angle < 0.99 and trial >= 10:
+                trade = -100.0
+        trial += trade
+        trialAdded += trade
+        maxAdded = max(maxAdded, trialAdded)
+        rows.append((trade, trial, trialAdded, maxAdded, benchmark / START * (maxAdded + START)))
+    return np.array(rows).T
+
+
+def test_backtestMatchesLoop():
+    # A falling market, so the minimum guard turns some sales away
+    rng = np.random.default_rng(8)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(-0.0004, 0.003, 20000)))
+    volumes = rng.lognormal(0, 1.2, 20000)
+    result = backtest(prices, volumes)
+    trades, trial, trialAdded, maxAdded, benchmarkAdjusted = loopBacktest(prices, volumes)
+    np.testing.assert_array_equal(result.trades, trades)
+    assert np.count_nonzero(signals(prices, volumes)[2]) > np.count_nonzero(trades < 0)
+    np.testing.assert_allclose(result.trial, trial, rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(result.trialAdded, trialAdded)
+    np.testing.assert_array_equal(result.maxAdded, maxAdded)
+    np.testing.assert_allclose(result.benchmarkAdjusted, benchmarkAdjusted, rtol=1e-9)
+
+
+def randomBars(count, seed):
+    rng = np.random.default_rng(seed)
+    return 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, count))), rng.lognormal(0, 1.2, count)
+
+
+@pytest.mark.parametrize("chunkSize", [1, 7, 20, 21, 1000])
+def test_chunkedBacktestMatchesWholeRun(chunkSize):
+    prices, volumes = randomBars(20000, seed=5)
+    whole = backtest(prices, volumes)
+    state = initialState()
+    parts = []
+    for start in range(0, len(prices), chunkSize):
+        result = backtest(prices[start:start + chunkSize], volumes[start:start + chunkSize], state=state)
+        state = result.state
+        parts.append(result)
+    for field in ("movingAverage", "trades", "benchmark", "trial", "trialAdded", "maxAdded", "benchmarkAdjusted"):
+        np.testing.assert_array_equal(np.concatenate([getattr(part, field) for part in parts]), getattr(whole, field))
+
+
+def test_streamedFilesMatchWholeRun(tmp_path):
+    prices, volumes = randomBars(3000, seed=6)
+    timestamps = 1577836800 + 60 * np.arange(len(prices))
+    # Two files written newest first like the Gemini downloads, overlapping by one bar
+    for name, bars in (("early.csv", slice(0, 1500)), ("late.csv", slice(1499, None))):
+        with open(tmp_path / name, "w") as file:
+            file.write("Unix Timestamp,Date,Symbol,Open,High,Low,Close,Volume\n")
+            rows = zip(timestamps[bars].tolist(), prices[bars].tolist(), volumes[bars].tolist())
+            for timestamp, price, volume in reversed(list(rows)):
+                date = np.datetime64(timestamp, "s").astype(str).replace("T", " ")
+                file.write("{},{},BTCUSD,{!r},{!r},{!r},{!r},{!r}\n".format(timestamp * 1000, date, price, price,
+                                                                         price, price, volume))
+    whole = backtest(prices, volumes)
+    parts = [result for _, result in streamBacktest(str(tmp_path / "*.csv"), chunkSize=256, cacheDir=str(tmp_path))]
+    np.testing.assert_array_equal(np.concatenate([part.trial for part in parts]), whole.trial)
+    np.testing.assert_array_equal(np.concatenate([part.trades for part in parts]), whole.trades)
+
+
+def test_drawdownMatchesKnownDrop():
+    # A rally with a volume spike every 10 bars buys in steadily, then the price falls 18.1% with no more trades
+    rally = 10000 * 1.0012 ** np.arange(300)
+    fall = rally[-1] * np.linspace(1, 0.819, 101)[1:]
+    prices = np.concatenate([np.full(20, 10000.0), rally, fall])
+    volumes = np.ones(len(prices))
+    volumes[20:320:10] = 100.0
+    result = backtest(prices, volumes)
+    assert np.count_nonzero(result.trades > 0) == 28 and not np.any(result.trades < 0)
+    summary = Summary()
+    summary.update(result)
+    assert abs(summary.summary()["maxDrawdown"] - 0.181) < 1e-9
+
+
+def test_drawdownIsTheSameInChunks():
+    rng = np.random.default_rng(7)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, 5000)))
+    volumes = rng.lognormal(0, 1.2, 5000)
+    whole = Summary()
+    whole.update(backtest(prices, volumes))
+    chunked = Summary()
+    state = initialState()
+    for start in range(0, len(prices), 700):
+        result = backtest(prices[start:start + 700], volumes[start:start + 700], state=state)
+        state = result.state
+        chunked.update(result)
+    assert 0 <= whole.maxDrawdown < 1
+    assert abs(chunked.maxDrawdown - whole.maxDrawdown) < 1e-12
@@ -0,0 +1,62 @@
+"""
+Checks that snapshots, forks and simulateBranches continue a run exactly as running it straight through would
+Run with python -m pytest test_branches.py
+"""
+import numpy as np
+
+from real_estate import SERIES_COLUMNS, Data, mainSet, simulate, simulateBranches
+from test_equivalence import randomSets
+
+
+def runFrom(data, changes=None):
+    """
+    Runs data to the end, applying changes (see Data.update) first if given, returning a row of metrics a month
+    """
+    if changes is not None:
+        data.update(changes)
+    rows = []
+    while data.month <= data.months:
+        data.simulateMonth()
+        rows.append(data.metrics())
+        data.month += 1
+    return np.array(rows, dtype=float)
+
+
+def startedRun(tmpSet, month):
+    data = Data(tmpSet)
+    data.setMonthlyRates()
+    while data.month < month:
+        data.simulateMonth()
+        data.month += 1
+    return data
+
+
+def test_forkAndRestoreContinueTheRun():
+    rng = np.random.default_rng(13)
+    for tmpSet in randomSets(12, seed=14):
+        month = int(rng.integers(1, 300))
+        straight = runFrom(startedRun(tmpSet, 0))[month:]
+        data = startedRun(tmpSet, month)
+        snapshot = data.snapshot()
+        np.testing.assert_array_equal(runFrom(data.fork()), straight)
+        np.testing.assert_array_equal(runFrom(data), straight)
+        # The snapshot is untouched by the run that went on from it, so it can be restored more than once,
+        # into any Data
+        for _ in range(2):
+            restored = Data(mainSet)
+            restored.restore(snapshot)
+            np.testing.assert_array_equal(runFrom(restored), straight)
+
+
+def test_branchesMatchSeparateRuns():
+    branches = [{}, {"holdTime": 2.0}, {"interest": 7.5, "market": 1.0}, {"time": 0}, {"additions": 6000.0}]
+    for tmpSet, month in zip(randomSets(6, seed=15) + [mainSet], (0, 1, 60, 150, 299, 300, 120)):
+        results = simulateBranches(tmpSet, month, branches)
+        np.testing.assert_array_equal(results[0], simulate(tmpSet))
+        for changes, series in zip(branches, results):
+            data = startedRun(tmpSet, month)
+            expected = runFrom(data, changes)
+            actual = np.column_stack([series[column] for column in SERIES_COLUMNS])
+            np.testing.assert_array_equal(actual[month:], expected)
+            np.testing.assert_array_equal(actual[:month], np.column_stack([results[0][column][:month]
+                                                                          for column in SERIES_COLUMNS]))
@@ -0,0 +1,57 @@
+"""
+Checks that the faster paths give the same answers as the plain ones they replace
+    simulateBatch against the scalar Data engine
+    Data.minimumDown against trying every 1% step in turn
+    time skipping against stepping every month
+Run with python -m pytest test_equivalence.py
+"""
+import numpy as np
+
+from real_estate import Data, calculateDTI, getResults, mainSet
+from real_estate_batch import simulateBatch
+
+# Keys some sets have set to 0, the case a DTI of 0 comes from
+ZEROED = ("income", "rent", "occupancy")
+
+
+def randomSets(count, seed):
+    """
+    mainSet with every value scaled by 0.5 to 1.5, and one of ZEROED set to 0 in about a third of them
+    """
+    rng = np.random.default_rng(seed)
+    sets = []
+    for _ in range(count):
+        tmpSet = {key: float(value) * rng.uniform(0.5, 1.5) for key, value in mainSet.items()}
+        if rng.random() < 1 / 3:
+            tmpSet[ZEROED[rng.integers(len(ZEROED))]] = 0.0
+        sets.append(tmpSet)
+    return sets
+
+
+def test_batchMatchesScalar():
+    sets = randomSets(80, seed=1) + [dict(mainSet, income=0.0, rent=0.0), dict(mainSet, income=0.0, occupancy=0.0)]
+    batch = simulateBatch(sets)
+    scalar = np.array([getResults(tmpSet) for tmpSet in sets])
+    np.testing.assert_allclose(batch, scalar, rtol=1e-9, atol=1e-6)
+
+
+
+def test_minimumDownMatchesLinearSearch():
+    rng = np.random.default_rng(2)
+    for tmpSet in randomSets(20, seed=3):
+        data = Data(tmpSet)
+        data.setMonthlyRates()
+        addedIncome = data.rent * data.occupancy / 100
+        for debt, income in zip(rng.uniform(0, 20000, 50), rng.choice([0.0, 2000.0, 10000.0, 40000.0], 50)):
+            expected = (None, None)
+            for down, mortgage in data.downPaymentSteps():
+                debtWith = debt + data.monthlyExpensesCostPerProperty(mortgage)
+                if calculateDTI(debtWith, income + addedIncome) <= data.maxDTI:
+                    expected = (down, mortgage)
+                    break
+            assert data.minimumDown(debt, income) == expected
+
+
+def test_skippingMatchesStepping():
+    for tmpSet in randomSets(30, seed=4):
+        np.testing.assert_allclose(getResults(tmpSet, skip=True), getResults(tmpSet), rtol=1e-9, atol=1e-6)
@@ -0,0 +1,66 @@
+"""
+Checks that the incremental indicators follow their batch forms tick by tick, and the batch forms the plain
+definitions they replace
+Run with python -m pytest test_indicators.py
+"""
+import numpy as np
+import pytest
+
+from indicators import Ema, RollingMean, RollingStd, ema, rollingStd, sma
+
+
+def randomSeries(seed, count=5000):
+    """
+    (prices, volumes, a series with a large offset and a small spread) from a seed
+    """
+    rng = np.random.default_rng(seed)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, count)))
+    volumes = rng.lognormal(0, 1.2, count)
+    offset = 1e6 + rng.normal(0, 1e-3, count)
+    return prices, volumes, offset
+
+
+def incremental(indicator, values):
+    return np.array([indicator.update(value) for value in values.tolist()])
+
+
+@pytest.mark.parametrize("window", [1, 2, 10, 20, 97])
+def test_smaMatchesSliceSums(window):
+    for values in randomSeries(27, count=1000):
+        plain = [sum(values[i + 1 - window:i + 1].tolist()) / window for i in range(window - 1, len(values))]
+        exact = sma(values, window, exact=True)
+        assert np.isnan(exact[:window - 1]).all()
+        np.testing.assert_array_equal(exact[window - 1:], plain)
+        np.testing.assert_allclose(sma(values, window)[window - 1:], plain, rtol=1e-9)
+
+
+@pytest.mark.parametrize("window", [1, 2, 10, 20, 97])
+def test_rollingMeanMatchesSma(window):
+    for values in randomSeries(28):
+        mean = incremental(RollingMean(window), values)
+        expected = sma(values, window, exact=True)
+        np.testing.assert_array_equal(np.isnan(mean), np.isnan(expected))
+        np.testing.assert_allclose(mean[window - 1:], expected[window - 1:], rtol=1e-12)
+
+
+@pytest.mark.parametrize("window, ddof", [(2, 0), (10, 0), (10, 1), (20, 1), (97, 0)])
+def test_rollingStdMatchesBatch(window, ddof):
+    for values in randomSeries(29):
+        std = incremental(RollingStd(window, ddof), values)
+        expected = rollingStd(values, window, ddof)
+        plain = [np.std(values[i + 1 - window:i + 1], ddof=ddof) for i in range(window - 1, len(values))]
+        np.testing.assert_array_equal(np.isnan(std), np.isnan(expected))
+        scale = np.std(values)
+        np.testing.assert_allclose(expected[window - 1:], plain, rtol=1e-7, atol=1e-9 * scale)
+        np.testing.assert_allclose(std[window - 1:], plain, rtol=1e-7, atol=1e-9 * scale)
+
+
+@pytest.mark.parametrize("span", [1, 2, 10, 63, 64, 65, 500])
+def test_emaMatchesRecurrence(span):
+    alpha = 2 / (span + 1)
+    for values in randomSeries(30):
+        plain = [values[0]]
+        for value in values[1:].tolist():
+            plain.append(alpha * value + (1 - alpha) * plain[-1])
+        np.testing.assert_allclose(ema(values, span=span), plain, rtol=1e-12)
+        np.testing.assert_array_equal(incremental(Ema(span=span), values), plain)
@@ -0,0 +1,27 @@
+"""
+Checks that the Monte Carlo processes are centred on the mainSet run they add noise to
+Run with python -m pytest test_monte_carlo.py
+"""
+import numpy as np
+
+from monteCarlo import PROCESSES, lognormalReturns, runMonteCarlo
+from real_estate import mainSet
+from real_estate_batch import monthlyRates, simulateBatch
+
+
+def test_zeroVolatilityMatchesDeterministicRun():
+    final = runMonteCarlo(paths=4, processes={"growth": (0.0,)})["final"]
+    np.testing.assert_allclose(final, np.tile(simulateBatch([mainSet])[0], (4, 1)), rtol=1e-12)
+
+
+def test_monthlyReturnsKeepTheirMean():
+    factors = 1 + monthlyRates(lognormalReturns(np.random.default_rng(0), 2000, 500, 8.0, 40.0))
+    # Standard error of the mean factor is about 0.116 / sqrt(1e6)
+    assert abs(factors.mean() - (1 + monthlyRates(np.float64(8.0)))) < 5e-4
+
+
+def test_meanOfPathsMatchesDeterministicRun():
+    deterministic = simulateBatch([mainSet])[0]
+    for key, process in PROCESSES.items():
+        final = runMonteCarlo(paths=2000, processes={key: process}, seed=1)["final"]
+        np.testing.assert_allclose(final[:, 0].mean(), deterministic[0], rtol=0.03, err_msg=key)
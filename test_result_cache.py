@@ -0,0 +1,80 @@
+"""
+Checks of ResultCache's hit and miss counting and its size bounded disk tier
+Run with python -m pytest test_result_cache.py
+"""
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+from real_estate import getResults, mainSet
+from result_cache import ResultCache
+
+
+def seededSets(count, seed):
+    rng = np.random.default_rng(seed)
+    return [dict(mainSet, additions=float(rng.uniform(1000, 4000)), holdTime=float(rng.uniform(2, 8)))
+            for _ in range(count)]
+
+
+def test_memoryTierCountsLikeAnLRU():
+    sets = seededSets(12, seed=10)
+    expected = [getResults(tmpSet) for tmpSet in sets]
+    cache = ResultCache(maxEntries=5)
+    # The same lookups made against a plain LRU of keys
+    lru = OrderedDict()
+    hits = misses = 0
+    computed = []
+    for i in np.random.default_rng(11).integers(len(sets), size=300):
+        key = cache.key(sets[i])
+        if key in lru:
+            lru.move_to_end(key)
+            hits += 1
+        else:
+            lru[key] = True
+            if len(lru) > 5:
+                lru.popitem(last=False)
+            misses += 1
+        result = cache.getOrCompute(sets[i], lambda params: computed.append(i) or getResults(params))
+        assert result == expected[i]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["diskHits"]) == (hits, misses, 0)
+    assert len(computed) == misses and stats["entries"] == 5
+
+
+def test_diskTierEvictsLeastRecentlyUsed(tmp_path):
+    sets = seededSets(29, seed=12)
+    expected = [getResults(tmpSet) for tmpSet in sets]
+    keys = [ResultCache().key(tmpSet) for tmpSet in sets]
+    size = len(pickle.dumps(expected[0], protocol=pickle.HIGHEST_PROTOCOL))
+    maxBytes = int(10.5 * size)
+    cache = ResultCache(maxEntries=2, directory=str(tmp_path), maxBytes=maxBytes)
+    # Each entry gets a distinct last used time in put order, the newest file is always the most recent
+    kept = []
+    for i, key in enumerate(keys):
+        cache.put(key, expected[i])
+        os.utime(cache.path(key), (1000 + i, 1000 + i))
+        kept.append(i)
+        if len(kept) * size > maxBytes:
+            kept = kept[-int(0.9 * maxBytes // size):]
+    assert sorted(keys.index(name[:-4]) for name in os.listdir(tmp_path)) == kept
+    assert cache.diskBytes == len(kept) * size <= maxBytes
+
+    # A new cache on the same directory finds what's left there and nothing else
+    shared = ResultCache(maxEntries=2, directory=str(tmp_path), maxBytes=maxBytes)
+    assert shared.diskBytes == cache.diskBytes
+    for i in range(len(sets)):
+        value = shared.get(keys[i])
+        assert value == (expected[i] if i in kept else None)
+    stats = shared.stats()
+    assert (stats["hits"], stats["diskHits"], stats["misses"]) == (len(kept), len(kept), len(sets) - len(kept))
+
+    # Reading the oldest entry marks it used, so the next eviction takes the one after it instead
+    oldest, second = kept[0], kept[1]
+    shared.get(keys[oldest])
+    extra = 0
+    while os.path.exists(shared.path(keys[second])):
+        extra += 1
+        shared.put(shared.key(dict(mainSet, additions=5000.0 + extra)), expected[0])
+    assert os.path.exists(shared.path(keys[oldest]))
@@ -0,0 +1,56 @@
+"""
+Checks that an interrupted runner.py run carries on to the same files an uninterrupted one writes
+Run with python -m pytest test_runner.py
+"""
+import json
+
+import numpy as np
+import pytest
+
+from runner import completeLines, resumePoint, runScenarios
+
+
+def writeScenarios(path, count, seed):
+    """
+    count scenarios varying a few mainSet keys, as JSONL
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as file:
+        for i in range(count):
+            scenario = {"id": "s{}".format(i), "additions": float(rng.uniform(1000, 4000)),
+                        "interest": float(rng.uniform(2, 8)), "holdTime": float(rng.uniform(2, 8))}
+            file.write(json.dumps(scenario) + "\n")
+
+
+def test_completeLinesDropsPartialLine(tmp_path):
+    path = tmp_path / "lines.csv"
+    path.write_bytes(b"a\nb\nc")
+    assert completeLines(str(path)) == 2
+    assert path.read_bytes() == b"a\nb\n"
+    assert completeLines(str(path), limit=1) == 1
+    assert path.read_bytes() == b"a\n"
+
+
+# Complete lines kept in the results and series files (headers included) and whether each ends in a partial line
+@pytest.mark.parametrize("results, series, partial", [(5, 13, True), (8, 6, False), (1, 0, True), (3, 8, False)])
+def test_resumeMatchesWholeRun(tmp_path, results, series, partial):
+    scenarios = str(tmp_path / "scenarios.jsonl")
+    writeScenarios(scenarios, 10, seed=9)
+    columns = ("totalAssets", "DTI")
+    whole, wholeSeries = str(tmp_path / "whole.csv"), str(tmp_path / "wholeSeries.csv")
+    runScenarios(scenarios, whole, wholeSeries, columns, chunksize=3, verbose=False)
+
+    output, seriesOutput = str(tmp_path / "out.csv"), str(tmp_path / "series.csv")
+    for source, target, kept in ((whole, output, results), (wholeSeries, seriesOutput, series)):
+        with open(source, "rb") as file:
+            lines = file.readlines()
+        with open(target, "wb") as file:
+            file.writelines(lines[:kept])
+            if partial:
+                file.write(lines[kept][:10])
+    done = resumePoint(output, seriesOutput, columns)
+    assert done == max(min(results - 1, (series - 1) // len(columns)), 0)
+    runScenarios(scenarios, output, seriesOutput, columns, chunksize=3, resume=True, verbose=False)
+    for expected, resumed in ((whole, output), (wholeSeries, seriesOutput)):
+        with open(expected, "rb") as first, open(resumed, "rb") as second:
+            assert first.read() == second.read()
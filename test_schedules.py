@@ -0,0 +1,58 @@
+"""
+Checks that the scalar engine, time skipping and the batch engine agree when the rates follow a RateSchedule
+Run with python -m pytest test_schedules.py
+"""
+import numpy as np
+import pytest
+
+from real_estate import Data, mainSet, simulate
+from real_estate_batch import MONTHS, SCHEDULED, simulateBatch
+from schedules import RateSchedule
+from test_equivalence import randomSets
+
+# Centre, monthly step and range of the random walk each scheduled value follows
+WALKS = {"interest": (5.0, 0.3, 0.5, 12.0), "market": (3.0, 1.0, -20.0, 20.0), "growth": (6.0, 1.5, -30.0, 30.0),
+         "rent": (1600.0, 40.0, 0.0, 4000.0), "occupancy": (92.0, 1.0, 50.0, 100.0)}
+
+
+def randomSchedule(seed, length=MONTHS + 1, keys=SCHEDULED):
+    """
+    A RateSchedule with every key in keys following a seeded random walk of length months
+    """
+    rng = np.random.default_rng(seed)
+    series = {}
+    for key in keys:
+        centre, step, low, high = WALKS[key]
+        series[key] = np.clip(centre + np.cumsum(rng.normal(0, step, length)), low, high)
+    return RateSchedule(**series)
+
+
+def scheduledResults(tmpSet, schedule, skip=False):
+    if not skip:
+        final = simulate(tmpSet, schedule=schedule)[-1]
+        return float(final["totalAssets"]), float(final["cashFlow"])
+    data = Data(tmpSet, schedule=schedule)
+    data.setMonthlyRates()
+    data.runSkipping()
+    totalAssets, cashFlow = data.results()
+    return float(totalAssets), float(cashFlow)
+
+
+@pytest.mark.parametrize("seed, length, keys", [(16, MONTHS + 1, SCHEDULED), (17, 120, SCHEDULED),
+                                                (18, MONTHS + 1, ("market",)), (19, 40, ("interest", "rent"))])
+def test_scheduledEnginesAgree(seed, length, keys):
+    schedule = randomSchedule(seed, length, keys)
+    sets = randomSets(15, seed=seed) + [mainSet]
+    scalar = np.array([scheduledResults(tmpSet, schedule) for tmpSet in sets])
+    skipping = np.array([scheduledResults(tmpSet, schedule, skip=True) for tmpSet in sets])
+    batch = simulateBatch(sets, schedules=schedule.annual)
+    np.testing.assert_allclose(skipping, scalar, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(batch, scalar, rtol=1e-9, atol=1e-6)
+
+
+def test_batchFollowsEachScenariosSchedule():
+    schedules = [randomSchedule(seed) for seed in range(20, 26)]
+    sets = randomSets(len(schedules), seed=26)
+    stacked = {key: np.stack([schedule.annual[key] for schedule in schedules]) for key in SCHEDULED}
+    scalar = np.array([scheduledResults(tmpSet, schedule) for tmpSet, schedule in zip(sets, schedules)])
+    np.testing.assert_allclose(simulateBatch(sets, schedules=stacked), scalar, rtol=1e-9, atol=1e-6)